@@ -0,0 +1,92 @@
+"""
+Measures login throughput and the latency of a cheap endpoint served at the
+same time, with password hashing run inline and on the process pool. The
+threads share one process, modelling a single gthread gunicorn worker as
+started by boot.sh.
+
+Usage: python benchmarks/login.py [num_of_logins] [num_of_threads]
+"""
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+basedir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, basedir)
+load_dotenv(os.path.join(basedir, '.env'))
+
+from server import create_app, db  # noqa: E402
+from server.controller import register_user  # noqa: E402
+from server.hashing import password_hasher  # noqa: E402
+
+app = create_app()
+
+CREDENTIALS = {'email': 'bench@user.com', 'password': 'benchmark'}
+
+
+def probe(client, stop, latencies):
+    while not stop.is_set():
+        start = time.perf_counter()
+        client.get('/ingredients/autocomplete?q=p')
+        latencies.append(time.perf_counter() - start)
+        time.sleep(0.01)
+
+
+def run(num_of_logins, num_of_threads, workers):
+    app.config['PASSWORD_HASH_WORKERS'] = workers
+    password_hasher.shutdown()
+
+    def log_in(_):
+        with app.test_client() as client:
+            resp = client.post('/login', json=CREDENTIALS)
+            assert resp.status_code == 200, resp.get_json()
+
+    latencies = []
+    stop = threading.Event()
+    prober = threading.Thread(
+        target=probe, args=(app.test_client(), stop, latencies))
+    prober.start()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(num_of_threads) as executor:
+        list(executor.map(log_in, range(num_of_logins)))
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    prober.join()
+
+    latencies.sort()
+    mode = f'{workers} hashing processes' if workers else 'inline hashing'
+    print(f'{mode}: {num_of_logins / elapsed:.1f} logins/s, '
+          f'probe median {statistics.median(latencies) * 1000:.1f} ms, '
+          f'p99 {latencies[int(len(latencies) * 0.99)] * 1000:.1f} ms')
+
+
+def main():
+    num_of_logins = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    num_of_threads = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DB_TEST_URI')
+    workers = app.config['PASSWORD_HASH_WORKERS'] or 2
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        try:
+            register_user(dict(CREDENTIALS, first_name='Bench',
+                               last_name='Mark'))
+
+            run(num_of_logins, num_of_threads, 0)
+            run(num_of_logins, num_of_threads, workers)
+        finally:
+            password_hasher.shutdown()
+            db.session.remove()
+            db.drop_all()
+
+
+if __name__ == '__main__':
+    main()
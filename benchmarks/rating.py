@@ -0,0 +1,86 @@
+"""
+Fires concurrent ratings from distinct users at a single recipe and checks
+that none of them are lost, reporting the rating throughput.
+
+Usage: python benchmarks/rating.py [num_of_ratings] [num_of_threads]
+"""
+import os
+import random
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+basedir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, basedir)
+load_dotenv(os.path.join(basedir, '.env'))
+
+from server import create_app, db  # noqa: E402
+from server.models import User, Recipe  # noqa: E402
+from server.controller import add_recipe, rate_recipe  # noqa: E402
+
+app = create_app()
+
+
+def setup(num_of_raters):
+    user_ids = [uuid.uuid4() for _ in range(num_of_raters + 1)]
+    db.session.execute(User.__table__.insert(), [{
+        'id': user_id,
+        'email': f'bench{i}@user.com',
+        'first_name': 'Bench',
+        'last_name': 'Mark',
+        'password': 'x'
+    } for i, user_id in enumerate(user_ids)])
+    db.session.commit()
+
+    recipe = add_recipe({
+        'name': 'Pork',
+        'preparation': 'Everybodys favorite dish',
+        'ingredients': ['Pork', 'Oil'],
+        'user_id': user_ids[0]
+    })
+
+    return recipe.id, user_ids[1:]
+
+
+def main():
+    num_of_ratings = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    num_of_threads = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DB_TEST_URI')
+    ratings = [random.randint(1, 5) for _ in range(num_of_ratings)]
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        try:
+            recipe_id, rater_ids = setup(num_of_ratings)
+
+            def rate(args):
+                rater_id, rating = args
+                with app.app_context():
+                    rate_recipe(
+                        {'rating': rating, 'user_id': rater_id}, recipe_id)
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(num_of_threads) as executor:
+                list(executor.map(rate, zip(rater_ids, ratings)))
+            elapsed = time.perf_counter() - start
+
+            db.session.remove()
+            recipe = db.session.query(Recipe).get(recipe_id)
+            lost = num_of_ratings - recipe.num_of_ratings
+
+            print(f'{num_of_ratings} ratings on {num_of_threads} threads '
+                  f'in {elapsed:.2f} s ({num_of_ratings / elapsed:.0f}/s)')
+            print(f'num_of_ratings={recipe.num_of_ratings} '
+                  f'rating_sum={recipe.rating_sum} (expected {sum(ratings)}) '
+                  f'lost={lost}')
+        finally:
+            db.session.remove()
+            db.drop_all()
+
+
+if __name__ == '__main__':
+    main()
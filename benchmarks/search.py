@@ -0,0 +1,117 @@
+"""
+Compares /recipe/search latency of the old LIKE filters with the full text
+search indexes on a seeded test database.
+
+Usage: python benchmarks/search.py [num_of_recipes]
+"""
+import os
+import random
+import sys
+import time
+import uuid
+
+from dotenv import load_dotenv
+from sqlalchemy import or_
+
+basedir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, basedir)
+load_dotenv(os.path.join(basedir, '.env'))
+
+from server import create_app, db  # noqa: E402
+from server.models import User, Recipe, Ingredient, recipe_ing  # noqa: E402
+from server.controller import search_recipes  # noqa: E402
+
+app = create_app()
+
+WORDS = [
+    'pork', 'beef', 'chicken', 'onion', 'garlic', 'tomato', 'basil', 'rice',
+    'pasta', 'butter', 'cream', 'lemon', 'pepper', 'salt', 'oil', 'beer',
+    'potato', 'carrot', 'celery', 'thyme', 'fry', 'bake', 'boil', 'roast',
+    'simmer', 'stir', 'chop', 'slice', 'grill', 'season', 'serve', 'mix'
+]
+BATCH = 5000
+REPEAT = 20
+
+
+def seed(num_of_recipes):
+    user_id = uuid.uuid4()
+    db.session.execute(User.__table__.insert(), [{
+        'id': user_id,
+        'email': 'bench@user.com',
+        'first_name': 'Bench',
+        'last_name': 'Mark',
+        'password': 'x'
+    }])
+
+    ingredient_ids = [uuid.uuid4() for _ in WORDS]
+    db.session.execute(Ingredient.__table__.insert(), [
+        {'id': ing_id, 'name': word}
+        for ing_id, word in zip(ingredient_ids, WORDS)
+    ])
+
+    for start in range(0, num_of_recipes, BATCH):
+        recipes = []
+        links = []
+        for _ in range(min(BATCH, num_of_recipes - start)):
+            recipe_id = uuid.uuid4()
+            recipes.append({
+                'id': recipe_id,
+                'name': ' '.join(random.sample(WORDS, 3)),
+                'preparation': ' '.join(random.choices(WORDS, k=60)),
+                'rating': 0,
+                'num_of_ratings': 0,
+                'user_id': user_id,
+                'num_of_ingredients': 3
+            })
+            links.extend(
+                {'recipe_id': recipe_id, 'ingredient_id': ing_id}
+                for ing_id in random.sample(ingredient_ids, 3))
+        db.session.execute(Recipe.__table__.insert(), recipes)
+        db.session.execute(recipe_ing.insert(), links)
+    db.session.commit()
+    db.session.execute('ANALYZE')
+
+
+def measure(fn):
+    fn()
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        fn()
+    return (time.perf_counter() - start) / REPEAT * 1000
+
+
+def like_search(term):
+    return db.session \
+        .query(Recipe) \
+        .join(Recipe.ingredients) \
+        .filter(or_(Recipe.name.contains(term),
+                    Recipe.preparation.contains(term))) \
+        .order_by(Recipe.id) \
+        .limit(app.config['RECIPES_PER_PAGE']) \
+        .all()
+
+
+def main():
+    num_of_recipes = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DB_TEST_URI')
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        try:
+            print(f'Seeding {num_of_recipes} recipes...')
+            seed(num_of_recipes)
+
+            for term in ('roast', 'garlic butter', 'stir fry chicken'):
+                before = measure(lambda: like_search(term))
+                after = measure(lambda: search_recipes(
+                    {'name': term, 'text': term}))
+                print(f'{term!r:>22}: LIKE {before:8.2f} ms   '
+                      f'full text {after:8.2f} ms')
+        finally:
+            db.session.remove()
+            db.drop_all()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Measures cold start: importing the server package, creating the app and
+serving the first request, each run in a fresh interpreter.
+
+Usage: python benchmarks/startup.py [num_of_runs]
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from dotenv import load_dotenv
+
+basedir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, basedir)
+load_dotenv(os.path.join(basedir, '.env'))
+
+STEPS = ['import', 'create_app', 'first_request']
+
+
+def measure():
+    start = time.perf_counter()
+    from server import create_app, db
+    imported = time.perf_counter()
+
+    app = create_app()
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DB_TEST_URI')
+    created = time.perf_counter()
+
+    resp = app.test_client().get('/recipe/all')
+    served = time.perf_counter()
+    assert resp.status_code == 200, resp.get_json()
+
+    print(json.dumps({
+        'import': imported - start,
+        'create_app': created - imported,
+        'first_request': served - created
+    }))
+    db.session.remove()
+
+
+def main():
+    num_of_runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+
+    from server import create_app, db
+    app = create_app()
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DB_TEST_URI')
+    env = dict(os.environ, CACHE_INVALIDATION='0', TOKEN_PRUNE_INTERVAL='0')
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        try:
+            runs = [
+                json.loads(subprocess.run(
+                    [sys.executable, __file__, '--measure'], env=env,
+                    check=True, stdout=subprocess.PIPE).stdout)
+                for _ in range(num_of_runs)
+            ]
+        finally:
+            db.session.remove()
+            db.drop_all()
+
+    for step in STEPS:
+        times = [run[step] * 1000 for run in runs]
+        print(f'{step}: median {statistics.median(times):.1f} ms, '
+              f'max {max(times):.1f} ms')
+
+
+if __name__ == '__main__':
+    if sys.argv[1:] == ['--measure']:
+        measure()
+    else:
+        main()
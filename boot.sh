@@ -8,4 +8,5 @@ while true; do
     echo Upgrade command failed, retrying in 5 secs...
     sleep 5
 done
-exec venv/bin/gunicorn -b :5000 --access-logfile - --error-logfile - food_app:server
\ No newline at end of file
+exec venv/bin/gunicorn -b :5000 -k gthread --threads ${GUNICORN_THREADS:-8} \
+    --access-logfile - --error-logfile - food_app:server
\ No newline at end of file
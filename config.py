@@ -4,7 +4,53 @@ import os
 class Config(object):
     SQLALCHEMY_DATABASE_URI = os.environ.get('DB_URI')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 5)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 10)),
+        'pool_timeout': float(os.environ.get('DB_POOL_TIMEOUT', 5)),
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': os.environ.get('DB_POOL_PRE_PING', '1') == '1',
+        # Milliseconds, 0 disables it
+        'connect_args': {'options': '-c statement_timeout={}'.format(
+            int(os.environ.get('DB_STATEMENT_TIMEOUT', 30000)))}
+    }
     SECRET_KEY = os.environ.get('SECRET_KEY')
+    HUNTER_KEY = os.environ.get('HUNTER_KEY')
+    HUNTER_ENDPOINT = os.environ.get('HUNTER_ENDPOINT')
+    CLEARBIT_KEY = os.environ.get('CLEARBIT_KEY')
+    CLEARBIT_PERSON_ENDPOINT = os.environ.get('CLEARBIT_PERSON_ENDPOINT')
     JWT_BLACKLIST_ENABLED = True
     JWT_BLACKLIST_TOKEN_CHECKS = ['access', 'refresh']
     JWT_ACCESS_TOKEN_EXPIRES = 3600
+    RECIPES_PER_PAGE = 20
+    MAX_RECIPES_PER_PAGE = 100
+    RECIPE_STREAM_BATCH = 1000
+    RESPONSE_CACHE_SIZE = 256
+    AUTOCOMPLETE_LIMIT = 10
+    MAX_AUTOCOMPLETE_LIMIT = 50
+    TOP_INGREDIENTS = 5
+    MAX_TOP_INGREDIENTS = 100
+    RATING_WRITE_BEHIND = os.environ.get('RATING_WRITE_BEHIND') == '1'
+    RATING_FLUSH_INTERVAL = float(os.environ.get('RATING_FLUSH_INTERVAL', 1))
+    RATING_FLUSH_THRESHOLD = int(os.environ.get('RATING_FLUSH_THRESHOLD', 500))
+    IMPORT_BATCH_SIZE = 10000
+    INGREDIENT_CACHE_SIZE = 10000
+    TOKEN_CACHE_SIZE = 10000
+    TOKEN_CACHE_TTL = int(os.environ.get('TOKEN_CACHE_TTL', 300))
+    CACHE_INVALIDATION = os.environ.get('CACHE_INVALIDATION', '1') == '1'
+    TOKEN_PRUNE_BATCH = 1000
+    TOKEN_PRUNE_INTERVAL = float(os.environ.get('TOKEN_PRUNE_INTERVAL', 3600))
+    EMAIL_CHECK_CACHE_SIZE = 10000
+    EMAIL_CHECK_TTL = int(os.environ.get('EMAIL_CHECK_TTL', 30 * 24 * 3600))
+    EMAIL_CHECK_NEGATIVE_TTL = int(
+        os.environ.get('EMAIL_CHECK_NEGATIVE_TTL', 24 * 3600))
+    EMAIL_CHECK_DEADLINE = float(os.environ.get('EMAIL_CHECK_DEADLINE', 2))
+    EMAIL_CHECK_WORKERS = 16
+    CIRCUIT_FAILURE_THRESHOLD = 5
+    CIRCUIT_RESET_TIMEOUT = 30
+    PASSWORD_HASH_METHOD = os.environ.get(
+        'PASSWORD_HASH_METHOD', 'pbkdf2:sha256:150000')
+    # Per gunicorn worker process
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+    PASSWORD_HASH_QUEUE = int(os.environ.get('PASSWORD_HASH_QUEUE', 4))
+    PASSWORD_HASH_TIMEOUT = 5
@@ -1 +1,3 @@
-from server import server
\ No newline at end of file
+from server import create_app
+
+server = create_app()
@@ -0,0 +1,34 @@
+"""recipe full text search indexes
+
+Revision ID: 1b2cc5cd7b6c
+Revises: ae559809c783
+Create Date: 2026-10-18 10:12:41.503112
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1b2cc5cd7b6c'
+down_revision = 'ae559809c783'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        'ix_recipe_name_tsv', 'recipe',
+        [sa.text("to_tsvector('english', coalesce(name, ''))")],
+        postgresql_using='gin'
+    )
+    op.create_index(
+        'ix_recipe_preparation_tsv', 'recipe',
+        [sa.text("to_tsvector('english', coalesce(preparation, ''))")],
+        postgresql_using='gin'
+    )
+
+
+def downgrade():
+    op.drop_index('ix_recipe_preparation_tsv', table_name='recipe')
+    op.drop_index('ix_recipe_name_tsv', table_name='recipe')
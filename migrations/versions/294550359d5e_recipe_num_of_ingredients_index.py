@@ -0,0 +1,24 @@
+"""recipe num_of_ingredients index
+
+Revision ID: 294550359d5e
+Revises: c3d9432e765e
+Create Date: 2026-10-18 12:20:53.662018
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '294550359d5e'
+down_revision = 'c3d9432e765e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_recipe_num_of_ingredients', 'recipe',
+                    ['num_of_ingredients', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_recipe_num_of_ingredients', table_name='recipe')
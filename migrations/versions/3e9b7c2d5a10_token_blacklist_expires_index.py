@@ -0,0 +1,26 @@
+"""index on token_blacklist.expires
+
+Revision ID: 3e9b7c2d5a10
+Revises: 8d2f6a1c4b7e
+Create Date: 2026-10-18 14:58:03.127846
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3e9b7c2d5a10'
+down_revision = '8d2f6a1c4b7e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(op.f('ix_token_blacklist_expires'), 'token_blacklist',
+                    ['expires'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_token_blacklist_expires'),
+                  table_name='token_blacklist')
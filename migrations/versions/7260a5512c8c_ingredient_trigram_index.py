@@ -0,0 +1,31 @@
+"""ingredient trigram index
+
+Revision ID: 7260a5512c8c
+Revises: 1b2cc5cd7b6c
+Create Date: 2026-10-18 11:02:19.284551
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '7260a5512c8c'
+down_revision = '1b2cc5cd7b6c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index(
+        'ix_ingredient_name_trgm', 'ingredient', ['name'],
+        postgresql_using='gin',
+        postgresql_ops={'name': 'gin_trgm_ops'}
+    )
+    op.create_index(
+        'ix_recipe_ing_ingredient_id', 'recipe_ing', ['ingredient_id'])
+
+
+def downgrade():
+    op.drop_index('ix_recipe_ing_ingredient_id', table_name='recipe_ing')
+    op.drop_index('ix_ingredient_name_trgm', table_name='ingredient')
@@ -0,0 +1,25 @@
+"""unique index on token_blacklist.jti
+
+Revision ID: 8d2f6a1c4b7e
+Revises: c65fac093de4
+Create Date: 2026-10-18 14:22:37.418265
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d2f6a1c4b7e'
+down_revision = 'c65fac093de4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(op.f('ix_token_blacklist_jti'), 'token_blacklist',
+                    ['jti'], unique=True)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_token_blacklist_jti'), table_name='token_blacklist')
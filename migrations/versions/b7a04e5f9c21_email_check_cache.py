@@ -0,0 +1,34 @@
+"""email check result cache
+
+Revision ID: b7a04e5f9c21
+Revises: 3e9b7c2d5a10
+Create Date: 2026-10-18 15:31:44.902517
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7a04e5f9c21'
+down_revision = '3e9b7c2d5a10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('email_check',
+    sa.Column('email', sa.Text(), nullable=False),
+    sa.Column('valid', sa.Boolean(), nullable=False),
+    sa.Column('first_name', sa.Text(), nullable=True),
+    sa.Column('last_name', sa.Text(), nullable=True),
+    sa.Column('expires', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('email')
+    )
+    op.create_index(op.f('ix_email_check_expires'), 'email_check',
+                    ['expires'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_email_check_expires'), table_name='email_check')
+    op.drop_table('email_check')
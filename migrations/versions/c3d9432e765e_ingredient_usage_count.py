@@ -0,0 +1,34 @@
+"""ingredient usage count
+
+Revision ID: c3d9432e765e
+Revises: 7260a5512c8c
+Create Date: 2026-10-18 11:47:05.917340
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3d9432e765e'
+down_revision = '7260a5512c8c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('ingredient', sa.Column(
+        'usage_count', sa.Integer(), server_default='0', nullable=False))
+    op.execute(
+        'UPDATE ingredient SET usage_count = counts.qty '
+        'FROM (SELECT ingredient_id, count(*) AS qty FROM recipe_ing '
+        'GROUP BY ingredient_id) AS counts '
+        'WHERE ingredient.id = counts.ingredient_id'
+    )
+    op.create_index(op.f('ix_ingredient_usage_count'), 'ingredient',
+                    ['usage_count'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_ingredient_usage_count'), table_name='ingredient')
+    op.drop_column('ingredient', 'usage_count')
@@ -0,0 +1,38 @@
+"""rating ledger and leaderboard index
+
+Revision ID: c65fac093de4
+Revises: f1c9d9bfd1f7
+Create Date: 2026-10-18 13:41:12.853094
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'c65fac093de4'
+down_revision = 'f1c9d9bfd1f7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('rating',
+    sa.Column('user_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('recipe_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('rating', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['recipe_id'], ['recipe.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'recipe_id')
+    )
+    op.create_index(op.f('ix_rating_recipe_id'), 'rating', ['recipe_id'],
+                    unique=False)
+    op.create_index('ix_recipe_leaderboard', 'recipe',
+                    ['rating', 'num_of_ratings', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_recipe_leaderboard', table_name='recipe')
+    op.drop_index(op.f('ix_rating_recipe_id'), table_name='rating')
+    op.drop_table('rating')
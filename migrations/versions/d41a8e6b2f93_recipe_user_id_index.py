@@ -0,0 +1,25 @@
+"""recipe user_id pagination index
+
+Revision ID: d41a8e6b2f93
+Revises: b7a04e5f9c21
+Create Date: 2026-10-18 17:02:51.336807
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd41a8e6b2f93'
+down_revision = 'b7a04e5f9c21'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_recipe_user_id', 'recipe', ['user_id', 'id'],
+                    unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_recipe_user_id', table_name='recipe')
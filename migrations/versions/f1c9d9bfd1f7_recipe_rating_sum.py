@@ -0,0 +1,29 @@
+"""recipe rating sum
+
+Revision ID: f1c9d9bfd1f7
+Revises: 294550359d5e
+Create Date: 2026-10-18 12:58:30.140276
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1c9d9bfd1f7'
+down_revision = '294550359d5e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('recipe', sa.Column(
+        'rating_sum', sa.Integer(), server_default='0', nullable=False))
+    op.execute(
+        'UPDATE recipe SET rating_sum = '
+        'round(coalesce(rating, 0) * coalesce(num_of_ratings, 0))'
+    )
+
+
+def downgrade():
+    op.drop_column('recipe', 'rating_sum')
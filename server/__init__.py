@@ -1,14 +1,34 @@
-from flask import Flask
+from flask import Blueprint, Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_jwt_extended import JWTManager
 
 from config import Config
 
-server = Flask(__name__)
-server.config.from_object(Config)
-db = SQLAlchemy(server)
-migrate = Migrate(server, db)
-jwt = JWTManager(server)
+db = SQLAlchemy()
+migrate = Migrate()
+jwt = JWTManager()
+api = Blueprint('api', __name__, cli_group=None)
 
-from server import models, routes, error_handlers
+
+def create_app(config=Config):
+    """
+    Creates the application. Routes, error handlers and CLI commands are
+    imported here, so importing the package stays cheap.
+    """
+    app = Flask(__name__)
+    app.config.from_object(config)
+
+    from server.pool import InstrumentedQueuePool
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = dict(
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'],
+        poolclass=InstrumentedQueuePool)
+
+    db.init_app(app)
+    migrate.init_app(app, db)
+    jwt.init_app(app)
+
+    from server import models, routes, error_handlers, commands  # noqa: F401
+    app.register_blueprint(api)
+
+    return app
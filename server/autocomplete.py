@@ -0,0 +1,70 @@
+import heapq
+import threading
+from bisect import bisect_left, insort
+
+from server import db
+from server.models import Ingredient
+
+
+class PrefixIndex(object):
+    """
+    In-process type-ahead index over ingredient names. Names are kept in a
+    sorted array searched with bisect and ranked by the number of recipes
+    using them. Loaded on first use and updated as ingredients and recipes
+    are created, so completions never hit the database.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.loaded = False
+        self._keys = []
+        self._counts = {}
+
+    def invalidate(self):
+        with self._lock:
+            self._reset()
+
+    def load(self):
+        with self._lock:
+            rows = db.session \
+                .query(Ingredient.name, Ingredient.usage_count) \
+                .all()
+
+            self._counts = dict(rows)
+            self._keys = sorted((name.lower(), name) for name in self._counts)
+            self.loaded = True
+
+    def add_ingredient(self, name):
+        with self._lock:
+            if self.loaded and name not in self._counts:
+                self._counts[name] = 0
+                insort(self._keys, (name.lower(), name))
+
+    def add_usage(self, names):
+        with self._lock:
+            if not self.loaded:
+                return
+            for name in names:
+                if name not in self._counts:
+                    insort(self._keys, (name.lower(), name))
+                self._counts[name] = self._counts.get(name, 0) + 1
+
+    def complete(self, prefix, limit):
+        if not self.loaded:
+            self.load()
+
+        prefix = prefix.lower()
+        with self._lock:
+            start = bisect_left(self._keys, (prefix,))
+            end = bisect_left(self._keys, (prefix + '\uffff',))
+            candidates = [name for _, name in self._keys[start:end]]
+            counts = self._counts
+
+            return heapq.nlargest(
+                limit, candidates, key=lambda name: counts[name])
+
+
+prefix_index = PrefixIndex()
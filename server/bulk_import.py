@@ -0,0 +1,223 @@
+import csv
+import io
+import json
+import time
+import uuid
+
+import psycopg2
+from flask import current_app
+from sqlalchemy import exc, text
+
+from server import db
+from server.autocomplete import prefix_index
+from server.cache import data_version, ingredient_match_cache
+from server.ingredient_index import ingredient_index
+from server.invalidation import bus
+from server.models import Recipe, Ingredient
+
+CSV_INGREDIENT_SEPARATOR = ';'
+
+STAGING_TABLES = [
+    'CREATE TEMP TABLE stage_ingredient '
+    '(id uuid, name varchar(60)) ON COMMIT DROP',
+    'CREATE TEMP TABLE stage_recipe '
+    '(id uuid, name varchar(40), preparation varchar, user_id uuid, '
+    'num_of_ingredients integer) ON COMMIT DROP',
+    'CREATE TEMP TABLE stage_recipe_ing '
+    '(recipe_id uuid, name varchar(60)) ON COMMIT DROP'
+]
+
+MERGE_STATEMENTS = [
+    'INSERT INTO ingredient (id, name, usage_count) '
+    'SELECT id, name, 0 FROM stage_ingredient '
+    'ON CONFLICT (name) DO NOTHING',
+    'INSERT INTO recipe (id, name, preparation, rating, rating_sum, '
+    'num_of_ratings, user_id, num_of_ingredients) '
+    'SELECT id, name, preparation, 0, 0, 0, user_id, num_of_ingredients '
+    'FROM stage_recipe',
+    'INSERT INTO recipe_ing (recipe_id, ingredient_id) '
+    'SELECT stage_recipe_ing.recipe_id, ingredient.id '
+    'FROM stage_recipe_ing '
+    'JOIN stage_recipe ON stage_recipe.id = stage_recipe_ing.recipe_id '
+    'JOIN ingredient ON ingredient.name = stage_recipe_ing.name',
+    'UPDATE ingredient SET usage_count = ingredient.usage_count + used.qty '
+    'FROM (SELECT ingredient.id, count(*) AS qty FROM stage_recipe_ing '
+    'JOIN stage_recipe ON stage_recipe.id = stage_recipe_ing.recipe_id '
+    'JOIN ingredient ON ingredient.name = stage_recipe_ing.name '
+    'GROUP BY ingredient.id) AS used '
+    'WHERE ingredient.id = used.id'
+]
+
+
+def parse_ndjson(lines):
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield None
+
+
+def parse_csv(lines):
+    """
+    Reads recipes from CSV with a header row of name, preparation, user_id
+    and ingredients, the ingredient names being separated by semicolons.
+    """
+    for row in csv.DictReader(lines):
+        ingredients = row.get('ingredients') or ''
+        row['ingredients'] = [
+            name.strip()
+            for name in ingredients.split(CSV_INGREDIENT_SEPARATOR)
+            if name.strip()
+        ]
+        yield row
+
+
+def _clean(record, default_user_id, force_user=False):
+    """
+    Validates a single record, returning a (name, preparation, user_id,
+    ingredients) tuple or None if the record cannot be imported. With
+    ``force_user`` the record's own user_id is ignored.
+    """
+    if not isinstance(record, dict):
+        return None
+
+    name = record.get('name')
+    preparation = record.get('preparation')
+    ingredients = record.get('ingredients') or []
+
+    user_id = default_user_id
+    if not force_user:
+        user_id = record.get('user_id') or default_user_id
+
+    try:
+        user_id = uuid.UUID(str(user_id))
+    except ValueError:
+        return None
+
+    if not isinstance(name, str) or \
+            not 0 < len(name) <= Recipe.name.type.length:
+        return None
+
+    if preparation is not None and not isinstance(preparation, str):
+        return None
+
+    if not isinstance(ingredients, list) or not all(
+            isinstance(ing, str) and
+            0 < len(ing) <= Ingredient.name.type.length
+            for ing in ingredients):
+        return None
+
+    return name, preparation, user_id, list(dict.fromkeys(ingredients))
+
+
+def _copy(cursor, table, rows):
+    data = io.StringIO()
+    csv.writer(data).writerows(rows)
+    data.seek(0)
+    cursor.copy_expert(f'COPY {table} FROM STDIN WITH (FORMAT csv)', data)
+
+
+def _import_batch(batch, known_names):
+    """
+    Loads a batch of cleaned records into staging tables with COPY and merges
+    them with a few set-based statements, all in one transaction. Returns
+    the number of imported and rejected recipes.
+    """
+    recipes = []
+    links = []
+    ingredients = []
+    for name, preparation, user_id, names in batch:
+        recipe_id = uuid.uuid4()
+        recipes.append((recipe_id, name, preparation, user_id, len(names)))
+        for ingredient in names:
+            links.append((recipe_id, ingredient))
+            if ingredient not in known_names:
+                known_names.add(ingredient)
+                ingredients.append((uuid.uuid4(), ingredient))
+
+    for statement in STAGING_TABLES:
+        db.session.execute(text(statement))
+
+    cursor = db.session.connection().connection.cursor()
+    try:
+        _copy(cursor, 'stage_ingredient', ingredients)
+        _copy(cursor, 'stage_recipe', recipes)
+        _copy(cursor, 'stage_recipe_ing', links)
+    finally:
+        cursor.close()
+
+    rejected = db.session.execute(text(
+        'DELETE FROM stage_recipe WHERE NOT EXISTS '
+        '(SELECT 1 FROM "user" WHERE "user".id = stage_recipe.user_id)'
+    )).rowcount
+
+    for statement in MERGE_STATEMENTS:
+        db.session.execute(text(statement))
+
+    bus.publish('import')
+    db.session.commit()
+
+    return len(recipes) - rejected, rejected
+
+
+@bus.subscribe('import')
+def recipes_imported(message=None):
+    """
+    Drops the in-process state invalidated by an import. The ingredient id
+    cache stays valid since ingredients are never deleted.
+    """
+    data_version.bump()
+    ingredient_match_cache.clear()
+    ingredient_index.invalidate()
+    prefix_index.invalidate()
+
+
+def import_recipes(records, user_id=None, force_user=False):
+    """
+    Imports recipe records in batches of IMPORT_BATCH_SIZE, yielding progress
+    statistics after each batch. Records without a user_id are assigned to
+    ``user_id``, as are all records with ``force_user``; invalid records and
+    unknown users are counted as rejected.
+    """
+    batch_size = current_app.config['IMPORT_BATCH_SIZE']
+    stats = {'imported': 0, 'rejected': 0, 'elapsed': 0.0,
+             'rows_per_second': 0.0}
+    start = time.perf_counter()
+    known_names = set()
+    batch = []
+
+    def flush():
+        imported, rejected = _import_batch(batch, known_names)
+        del batch[:]
+        elapsed = time.perf_counter() - start
+        stats['imported'] += imported
+        stats['rejected'] += rejected
+        stats['elapsed'] = round(elapsed, 3)
+        stats['rows_per_second'] = round(
+            (stats['imported'] + stats['rejected']) / elapsed, 1)
+        return dict(stats)
+
+    try:
+        for record in records:
+            cleaned = _clean(record, user_id, force_user)
+            if cleaned is None:
+                stats['rejected'] += 1
+                continue
+
+            batch.append(cleaned)
+            if len(batch) >= batch_size:
+                yield flush()
+
+        if batch:
+            yield flush()
+        elif not stats['imported']:
+            yield dict(stats)
+    except (exc.SQLAlchemyError, psycopg2.Error):
+        db.session.rollback()
+        yield dict(stats, error='Internal server error')
+    finally:
+        if stats['imported']:
+            recipes_imported()
@@ -0,0 +1,176 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import request, current_app, make_response
+
+
+class DataVersion(object):
+    """
+    Counter identifying the current state of the recipe data. Every write
+    that changes what the cached endpoints return bumps it, which implicitly
+    invalidates all responses cached under an older version.
+    """
+
+    def __init__(self):
+        self._value = 0
+        self._lock = threading.Lock()
+
+    @property
+    def value(self):
+        return self._value
+
+    def bump(self):
+        with self._lock:
+            self._value += 1
+            return self._value
+
+
+class LRUCache(object):
+    """
+    Thread safe mapping that evicts the least recently used entry once it
+    holds more than ``maxsize`` entries. ``maxsize`` is either a number or
+    the name of the setting holding it, read from the current app's config.
+
+    ``generation`` counts the pops and clears. A value computed after reading
+    it can be stored with ``set(..., generation=...)``, which drops the value
+    if an entry was invalidated in the meantime, so that a slow read started
+    before a write cannot cache what the write replaced.
+    """
+
+    def __init__(self, maxsize):
+        self._maxsize = maxsize
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    @property
+    def maxsize(self):
+        if isinstance(self._maxsize, str):
+            return current_app.config[self._maxsize]
+        return self._maxsize
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                self._data.move_to_end(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return self._data[key]
+
+    def set(self, key, value, generation=None):
+        maxsize = self.maxsize
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            self.generation += 1
+            return self._data.pop(key, default)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._data.clear()
+
+    def stats(self):
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses
+        }
+
+
+class TTLCache(LRUCache):
+    """
+    LRUCache whose entries expire ``ttl`` seconds after being set, or at the
+    ``expires`` timestamp given to ``set`` if that comes first. Like
+    ``maxsize``, ``ttl`` may name a config setting.
+    """
+
+    def __init__(self, maxsize, ttl):
+        super().__init__(maxsize)
+        self._ttl = ttl
+
+    @property
+    def ttl(self):
+        if isinstance(self._ttl, str):
+            return current_app.config[self._ttl]
+        return self._ttl
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] > time.time():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+            if entry is not None:
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value, expires=None, generation=None):
+        deadline = time.time() + self.ttl
+        if expires is not None:
+            deadline = min(deadline, expires)
+        super().set(key, (deadline, value), generation)
+
+
+data_version = DataVersion()
+responses = LRUCache('RESPONSE_CACHE_SIZE')
+# Ingredient name -> id
+ingredient_id_cache = LRUCache('INGREDIENT_CACHE_SIZE')
+# Ingredient search term -> ids of the ingredients whose name contains it
+ingredient_match_cache = LRUCache('INGREDIENT_CACHE_SIZE')
+# Token jti -> revoked
+revoked_tokens = TTLCache('TOKEN_CACHE_SIZE', 'TOKEN_CACHE_TTL')
+# Normalized email -> check_email result
+email_checks = TTLCache('EMAIL_CHECK_CACHE_SIZE', 'EMAIL_CHECK_TTL')
+
+
+def cached_response(view):
+    """
+    Caches successful responses of a read endpoint per URL and data version,
+    tagging them with a strong ETag. A matching If-None-Match is answered
+    with 304 straight from the cache, without calling the view.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        version = data_version.value
+        key = request.full_path
+        entry = responses.get(key)
+
+        if entry is None or entry[0] != version:
+            rv = make_response(view(*args, **kwargs))
+            if rv.is_streamed or rv.status_code != 200:
+                return rv
+
+            body = rv.get_data()
+            entry = (version, body, rv.mimetype,
+                     hashlib.sha1(body).hexdigest())
+            responses.set(key, entry)
+
+        _, body, mimetype, etag = entry
+        response = current_app.response_class(body, mimetype=mimetype)
+        response.set_etag(etag)
+
+        return response.make_conditional(request)
+
+    return wrapper
@@ -0,0 +1,96 @@
+import threading
+import time
+
+
+class CircuitOpen(Exception):
+    pass
+
+
+class CircuitBreaker(object):
+    """
+    Fails calls to an upstream fast once it has failed ``failure_threshold``
+    times in a row. After ``reset_timeout`` seconds a single trial call is let
+    through; its success closes the circuit again, its failure keeps it open
+    for another ``reset_timeout`` seconds.
+    """
+
+    def __init__(self, name, failure_threshold, reset_timeout):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.failures = 0
+            self._opened_at = None
+            self._trial = False
+
+    @property
+    def state(self):
+        if self._opened_at is None:
+            return 'closed'
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half-open' and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial = False
+            if self._opened_at is not None or \
+                    self.failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+
+    def run(self, func, *args, deadline=None):
+        """
+        Calls ``func`` and records the outcome, without checking the circuit.
+        Given a ``deadline`` on the time.monotonic() clock, ``func`` gets the
+        remaining seconds as its ``timeout`` argument and is not called at
+        all once the deadline has passed. Calls finishing past the deadline
+        are not recorded, the caller having already recorded them as
+        failures when it gave up waiting.
+        """
+        kwargs = {}
+        if deadline is not None:
+            kwargs['timeout'] = deadline - time.monotonic()
+            if kwargs['timeout'] <= 0:
+                return None
+
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            if deadline is None or time.monotonic() <= deadline:
+                self.record_failure()
+            raise
+
+        if deadline is None or time.monotonic() <= deadline:
+            self.record_success()
+
+        return result
+
+    def call(self, func, *args, deadline=None):
+        """
+        Calls ``func`` like ``run``, failing fast if the circuit is open.
+        """
+        if not self.allow():
+            raise CircuitOpen(self.name)
+
+        return self.run(func, *args, deadline=deadline)
@@ -0,0 +1,130 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+
+from server.circuit_breaker import CircuitBreaker
+
+HUNTER_ENDPOINT = 'https://api.hunter.io/v2/{}'
+CLEARBIT_PERSON_ENDPOINT = 'https://person.clearbit.com/v2/people'
+PENDING = {'pending': True}
+
+_lock = threading.Lock()
+_hunter = None
+_clearbit = None
+_breakers = {}
+_email_executor = None
+
+
+class HunterClient(object):
+    """
+    Minimal Hunter API client whose requests always carry a timeout, which
+    PyHunter does not support.
+    """
+
+    def __init__(self, session, key, endpoint):
+        self.session = session
+        self.key = key
+        self.endpoint = endpoint
+
+    def email_verifier(self, email, timeout):
+        response = self.session.get(
+            self.endpoint.format('email-verifier'),
+            params={'email': email, 'api_key': self.key}, timeout=timeout)
+        response.raise_for_status()
+
+        return response.json()['data']
+
+
+class ClearbitClient(object):
+    """
+    Minimal Clearbit Person API client whose requests always carry a
+    timeout. Unknown people are returned as an empty dict, people Clearbit
+    is still looking up as PENDING.
+    """
+
+    def __init__(self, session, key, endpoint):
+        self.session = session
+        self.key = key
+        self.endpoint = endpoint
+
+    def find_person(self, email, timeout):
+        response = self.session.get(
+            self.endpoint + '/find', params={'email': email},
+            auth=(self.key, ''), timeout=timeout)
+        if response.status_code == 404:
+            return {}
+        response.raise_for_status()
+
+        # 202 means the lookup is queued on Clearbit's side
+        if response.status_code == 202:
+            return PENDING
+
+        return response.json()
+
+
+def _session():
+    import requests
+
+    return requests.Session()
+
+
+def get_hunter():
+    """
+    Hunter client, built from the application config on first use.
+    """
+    global _hunter
+
+    with _lock:
+        if _hunter is None:
+            _hunter = HunterClient(
+                _session(), current_app.config['HUNTER_KEY'],
+                current_app.config['HUNTER_ENDPOINT'] or HUNTER_ENDPOINT)
+
+        return _hunter
+
+
+def get_clearbit():
+    """
+    Clearbit client, built from the application config on first use.
+    """
+    global _clearbit
+
+    with _lock:
+        if _clearbit is None:
+            _clearbit = ClearbitClient(
+                _session(), current_app.config['CLEARBIT_KEY'],
+                current_app.config['CLEARBIT_PERSON_ENDPOINT'] or
+                CLEARBIT_PERSON_ENDPOINT)
+
+        return _clearbit
+
+
+def get_breaker(name):
+    """
+    Circuit breaker of the named upstream, built from the application config
+    on first use.
+    """
+    with _lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(
+                name, current_app.config['CIRCUIT_FAILURE_THRESHOLD'],
+                current_app.config['CIRCUIT_RESET_TIMEOUT'])
+
+        return _breakers[name]
+
+
+def get_email_executor():
+    """
+    Thread pool running the email lookups, built from the application config
+    on first use.
+    """
+    global _email_executor
+
+    with _lock:
+        if _email_executor is None:
+            _email_executor = ThreadPoolExecutor(
+                current_app.config['EMAIL_CHECK_WORKERS'],
+                thread_name_prefix='email-check')
+
+        return _email_executor
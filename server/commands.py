@@ -0,0 +1,36 @@
+import click
+
+from server import api
+from server.bulk_import import import_recipes, parse_csv, parse_ndjson
+from server.jwt.jwt_util import prune_database
+
+
+@api.cli.command('import-recipes')
+@click.argument('source', type=click.File('r', encoding='utf-8'))
+@click.option('--format', 'file_format', type=click.Choice(['ndjson', 'csv']),
+              help='Input format, guessed from the file extension if omitted.')
+@click.option('--user-id', help='Owner of records without a user_id.')
+def import_recipes_command(source, file_format, user_id):
+    """Bulk import recipes from an NDJSON or CSV file."""
+    if file_format is None:
+        file_format = 'csv' if source.name.endswith('.csv') else 'ndjson'
+    parse = parse_csv if file_format == 'csv' else parse_ndjson
+
+    for stats in import_recipes(parse(source), user_id):
+        if 'error' in stats:
+            raise click.ClickException(stats['error'])
+
+        click.echo(
+            f"imported {stats['imported']} rejected {stats['rejected']} "
+            f"in {stats['elapsed']:.1f} s "
+            f"({stats['rows_per_second']:.0f} rows/s)")
+
+
+@api.cli.command('prune-tokens')
+@click.option('--batch-size', type=click.IntRange(min=1),
+              help='Rows deleted per transaction.')
+def prune_tokens_command(batch_size):
+    """Delete expired tokens from the database."""
+    stats = prune_database(batch_size)
+    click.echo(f"deleted {stats['deleted']} expired tokens "
+               f"in {stats['elapsed']:.1f} s")
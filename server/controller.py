@@ -1,33 +1,110 @@
-import os
-import clearbit
-from flask import abort
-from sqlalchemy import func, desc, exc, or_
-from pyhunter import PyHunter
+import time
+import uuid
+from concurrent.futures import TimeoutError
+
+from flask import abort, current_app
+from sqlalchemy import (func, exc, or_, exists, false, literal_column,
+                        text, cast, Float)
+from sqlalchemy.dialects.postgresql import insert
 from flask_jwt_extended import (
     create_access_token, create_refresh_token, get_jwt_identity, decode_token)
 from server.jwt.jwt_util import (
-    add_token_to_database,
+    add_tokens_to_database,
     revoke_token
 )
 
 from server import db
-from server.models import User, Recipe, Ingredient, recipe_ing
-
-hunter = PyHunter(os.environ.get('HUNTER_KEY'))
-clearbit.key = os.environ.get('CLEARBIT_KEY')
+from server.clients import (get_hunter, get_clearbit, get_breaker,
+                            get_email_executor, PENDING)
+from server.autocomplete import prefix_index
+from server.cache import (data_version, ingredient_id_cache,
+                          ingredient_match_cache)
+from server.email_check import (normalize_email, get_email_check,
+                                store_email_check)
+from server.hashing import password_hasher
+from server.ingredient_index import ingredient_index
+from server.invalidation import bus
+from server.models import (User, Recipe, Ingredient, recipe_ing,
+                           search_vector)
+from server.pagination import paginate, paginate_ids, Page
+from server.rating_buffer import rating_buffer
+
+
+def lookup_email(email):
+    """
+    Runs the Hunter verification and the Clearbit person lookup concurrently
+    under a single EMAIL_CHECK_DEADLINE. Returns both results, None standing
+    for an upstream that failed, timed out or whose circuit is open.
+    """
+    deadline = time.monotonic() + current_app.config['EMAIL_CHECK_DEADLINE']
+    upstreams = [
+        (get_breaker('hunter'), get_hunter().email_verifier),
+        (get_breaker('clearbit'), get_clearbit().find_person)
+    ]
+    executor = get_email_executor()
+
+    # Checked here rather than on the pool, so that an open circuit costs
+    # nothing even when every pool thread is stuck on a hung upstream
+    calls = [
+        (breaker, executor.submit(
+            breaker.run, lookup, email, deadline=deadline)
+         if breaker.allow() else None)
+        for breaker, lookup in upstreams
+    ]
+
+    results = []
+    for breaker, future in calls:
+        if future is None:
+            results.append(None)
+            continue
+
+        try:
+            results.append(
+                future.result(max(deadline - time.monotonic(), 0)))
+        except TimeoutError:
+            future.cancel()
+            breaker.record_failure()
+            results.append(None)
+        except Exception as error:
+            current_app.logger.warning(
+                'Email lookup failed on %s: %r', breaker.name, error)
+            results.append(None)
+
+    return results
 
 
 def check_email(email):
-    check_email = hunter.email_verifier(email)
-
-    if check_email['result'] == 'undeliverable':
+    email = normalize_email(email)
+    result = get_email_check(email)
+
+    if result is None:
+        verification, person = lookup_email(email)
+
+        if verification is None and person is None:
+            abort(503, 'Email check unavailable')
+
+        if verification is not None and \
+                verification['result'] == 'undeliverable':
+            result = {'valid': False, 'first_name': None, 'last_name': None}
+            store_email_check(email, result)
+        else:
+            name = (person or {}).get('name') or {}
+            result = {
+                'valid': True,
+                'first_name': name.get('givenName'),
+                'last_name': name.get('familyName')
+            }
+            # Partial and pending results are returned but not cached
+            if verification is not None and person is not None and \
+                    person is not PENDING:
+                store_email_check(email, result)
+
+    if not result['valid']:
         abort(400, 'Invalid email')
 
-    response = clearbit.Person.find(email=email)
-
     return {
-        'first_name': response['name']['givenName'],
-        'last_name': response['name']['familyName']
+        'first_name': result['first_name'],
+        'last_name': result['last_name']
     }
 
 
@@ -44,9 +121,9 @@ def register_user(user_info):
     new_user = User(
         email=user_info['email'],
         first_name=user_info['first_name'],
-        last_name=user_info['last_name']
+        last_name=user_info['last_name'],
+        password=password_hasher.hash(user_info['password'])
     )
-    new_user.set_password(user_info['password'])
 
     try:
         db.session.add(new_user)
@@ -70,14 +147,17 @@ def login(user_info):
     if not user:
         abort(401, 'User does not exist')
 
-    if not user.check_password(user_info['password']):
+    if not password_hasher.verify(user.password, user_info['password']):
         abort(403, 'Invalid credentials')
 
+    # Persisted along with the tokens
+    if password_hasher.needs_rehash(user.password):
+        user.password = password_hasher.hash(user_info['password'])
+
     access_token = create_access_token(identity=user.id)
     refresh_token = create_refresh_token(identity=user.id)
 
-    add_token_to_database(access_token)
-    add_token_to_database(refresh_token)
+    add_tokens_to_database([access_token, refresh_token])
 
     return {
         'access_token': access_token,
@@ -97,6 +177,66 @@ def logout(token_id):
         abort(404, 'Logout unsuccesful')
 
 
+def ingredients_created(created):
+    """
+    Updates the in-process ingredient caches and indexes once the given
+    (id, name) pairs are committed.
+    """
+    if not created:
+        return
+
+    ingredient_match_cache.clear()
+    for ingredient_id, name in created:
+        ingredient_id_cache.set(name, ingredient_id)
+        ingredient_index.add_ingredient(ingredient_id, name)
+        prefix_index.add_ingredient(name)
+
+
+def recipe_created(recipe_id, ingredients, created):
+    """
+    Updates the in-process caches and indexes once a recipe using the given
+    (id, name) ingredient pairs is committed.
+    """
+    data_version.bump()
+    ingredients_created(created)
+    ingredient_index.add_recipe(recipe_id, ingredients)
+    prefix_index.add_usage([name for _, name in ingredients])
+
+
+def _ingredient_pairs(pairs):
+    return [(uuid.UUID(ingredient_id), name) for ingredient_id, name in pairs]
+
+
+@bus.subscribe('ingredients')
+def ingredients_created_elsewhere(message):
+    data_version.bump()
+    ingredients_created(_ingredient_pairs(message['created']))
+
+
+@bus.subscribe('recipe')
+def recipe_created_elsewhere(message):
+    recipe_created(uuid.UUID(message['id']),
+                   _ingredient_pairs(message['ingredients']),
+                   _ingredient_pairs(message['created']))
+
+
+def warm_ingredient_cache():
+    """
+    Fills the ingredient name cache with the most used ingredients.
+    """
+    try:
+        rows = db.session \
+            .query(Ingredient.name, Ingredient.id) \
+            .order_by(Ingredient.usage_count.desc()) \
+            .limit(ingredient_id_cache.maxsize) \
+            .all()
+    except exc.SQLAlchemyError:
+        return
+
+    for name, ingredient_id in reversed(rows):
+        ingredient_id_cache.set(name, ingredient_id)
+
+
 def add_ingredient(name):
     if not name:
         abort(400, 'Ingredient name not provided')
@@ -105,84 +245,293 @@ def add_ingredient(name):
 
     try:
         db.session.add(new_ingredient)
+        db.session.flush()
+        ingredient_id = new_ingredient.id
+        bus.publish('ingredients', created=[(ingredient_id, name)])
         db.session.commit()
     except exc.SQLAlchemyError:
         abort(500, 'Internal server error')
 
+    data_version.bump()
+    ingredients_created([(ingredient_id, name)])
+
     return new_ingredient
 
 
+def resolve_ingredients(names):
+    """
+    Maps ingredient names to ids within the current transaction. Names are
+    looked up in the ingredient cache first, the rest with one query, and the
+    missing ones are created with a single INSERT ... ON CONFLICT DO NOTHING.
+    Returns the mapping and the list of (id, name) pairs that were created.
+    """
+    ids = {}
+    for name in names:
+        ingredient_id = ingredient_id_cache.get(name)
+        if ingredient_id is not None:
+            ids[name] = ingredient_id
+
+    unknown = [name for name in names if name not in ids]
+    if unknown:
+        found = db.session \
+            .query(Ingredient.name, Ingredient.id) \
+            .filter(Ingredient.name.in_(unknown)) \
+            .all()
+        for name, ingredient_id in found:
+            ids[name] = ingredient_id
+            ingredient_id_cache.set(name, ingredient_id)
+
+    missing = [name for name in names if name not in ids]
+    created = []
+
+    if missing:
+        statement = insert(Ingredient.__table__) \
+            .values([{'id': uuid.uuid4(), 'name': name} for name in missing]) \
+            .on_conflict_do_nothing(index_elements=['name']) \
+            .returning(Ingredient.id, Ingredient.name)
+        created = [(row.id, row.name)
+                   for row in db.session.execute(statement)]
+        ids.update((name, ing_id) for ing_id, name in created)
+
+        # Created by a concurrent transaction in the meantime
+        raced = [name for name in missing if name not in ids]
+        if raced:
+            ids.update(db.session
+                       .query(Ingredient.name, Ingredient.id)
+                       .filter(Ingredient.name.in_(raced)))
+
+    return ids, created
+
+
 def add_recipe(recipe_info):
-    ingredient_list = []
+    names = []
 
     if 'ingredients' in list(recipe_info.keys()):
-        for ing in recipe_info['ingredients']:
-            instance = db.session.query(Ingredient).filter(
-                Ingredient.name == ing).first()
-            if instance:
-                ingredient_list.append(instance)
-            else:
-                ingredient_list.append(add_ingredient(ing))
+        names = list(dict.fromkeys(recipe_info['ingredients']))
+
+    if not all(names):
+        abort(400, 'Ingredient name not provided')
 
     try:
+        ids, created = resolve_ingredients(names) if names else ({}, [])
+        ingredient_ids = [ids[name] for name in names]
+
         new_recipe = Recipe(
             name=recipe_info['name'],
             preparation=recipe_info['preparation'],
-            ingredients=ingredient_list,
             user_id=recipe_info['user_id'],
-            num_of_ingredients=len(ingredient_list)
+            num_of_ingredients=len(names)
         )
         db.session.add(new_recipe)
+        db.session.flush()
+        recipe_id = new_recipe.id
+
+        if ingredient_ids:
+            db.session.execute(recipe_ing.insert().values([
+                {'recipe_id': recipe_id, 'ingredient_id': ing_id}
+                for ing_id in ingredient_ids
+            ]))
+            db.session \
+                .query(Ingredient) \
+                .filter(Ingredient.id.in_(ingredient_ids)) \
+                .update({Ingredient.usage_count: Ingredient.usage_count + 1},
+                        synchronize_session=False)
+        ingredients = list(zip(ingredient_ids, names))
+        bus.publish('recipe', id=recipe_id, ingredients=ingredients,
+                    created=created)
         db.session.commit()
     except exc.DataError:
         abort(400, 'Invalid user')
+    except exc.IntegrityError:
+        abort(400, 'Invalid user')
     except exc.SQLAlchemyError:
         abort(500, 'Internal server error')
 
+    recipe_created(recipe_id, ingredients, created)
+
     return new_recipe
 
 
-def get_all_recipes():
-    return db.session.query(Recipe).all()
+def get_all_recipes(args=None):
+    try:
+        recipes = paginate(db.session.query(Recipe), args or {}, [Recipe.id])
+    except exc.SQLAlchemyError:
+        abort(500, 'Internal server error')
+
+    return recipes
 
 
-def rate_recipe(data, recipe_id):
-    keys = list(data.keys())
+def iter_all_recipes():
+    """
+    Yields the whole recipe catalog in batches, reading it through a
+    server-side cursor so only one batch is held in memory at a time.
+    """
+    batch_size = current_app.config['RECIPE_STREAM_BATCH']
+    query = db.session \
+        .query(Recipe) \
+        .order_by(Recipe.id) \
+        .execution_options(stream_results=True) \
+        .yield_per(batch_size)
 
-    if 'rating' not in keys or 'user_id' not in keys or not recipe_id:
+    batch = []
+    for recipe in query:
+        batch.append(recipe)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+
+    if batch:
+        yield batch
+
+
+def get_cookable_recipes(args):
+    if 'ingredients' not in list(args.keys()):
         abort(400, 'Invalid request')
 
-    user_rating = int(data['rating'])
-    if user_rating > 5 or user_rating < 1:
-        abort(400, 'Rating out of range')
+    try:
+        max_missing = int(args.get('missing', 0))
+    except ValueError:
+        abort(400, 'Invalid request')
+
+    if max_missing < 0:
+        abort(400, 'Invalid request')
+
+    recipe_ids = ingredient_index.coverage(
+        args['ingredients'].split(','), max_missing)
+
+    page_ids, next_cursor = paginate_ids(recipe_ids, args, Recipe.id)
+
+    if not page_ids:
+        return Page([])
+
+    try:
+        recipes = db.session \
+            .query(Recipe) \
+            .filter(Recipe.id.in_(page_ids)) \
+            .order_by(Recipe.id) \
+            .all()
+    except exc.SQLAlchemyError:
+        abort(500, 'Internal server error')
+
+    return Page(recipes, next_cursor)
+
 
+def buffer_rating(data, recipe_id, user_rating):
+    """
+    Validates a rating and hands it over to the write-behind buffer. The
+    returned recipe does not include the new rating until it is flushed.
+    """
     try:
-        recipe = db.session.query(Recipe).filter(
-            Recipe.id == recipe_id).first()
+        recipe = db.session \
+            .query(Recipe.id, Recipe.name, Recipe.rating,
+                   Recipe.num_of_ratings, Recipe.user_id,
+                   exists().where(User.id == data['user_id'])
+                   .label('valid_user')) \
+            .filter(Recipe.id == recipe_id) \
+            .first()
     except exc.DataError:
         abort(400, 'Recipe not found')
+    except exc.SQLAlchemyError:
+        abort(500, 'Internal server error')
+
+    if recipe is None:
+        abort(400, 'Recipe not found')
 
-    if recipe.user_id == data['user_id']:
+    if not recipe.valid_user:
+        abort(400, 'Invalid user')
+
+    if str(recipe.user_id) == str(data['user_id']):
         abort(400, 'Users cannot rate their own recipes')
 
-    recipe.rating = (
-        (recipe.rating * recipe.num_of_ratings + user_rating) /
-        (recipe.num_of_ratings + 1)
+    rating_buffer.add(recipe.id, data['user_id'], user_rating)
+
+    return recipe
+
+
+def get_top_rated_recipes(args=None):
+    try:
+        query = db.session.query(Recipe).filter(Recipe.num_of_ratings > 0)
+        recipes = paginate(query, args or {},
+                           [Recipe.rating, Recipe.num_of_ratings, Recipe.id],
+                           descending=True)
+    except exc.SQLAlchemyError:
+        abort(500, 'Internal server error')
+
+    return recipes
+
+
+def rate_recipe(data, recipe_id):
+    keys = list(data.keys())
+
+    if 'rating' not in keys or 'user_id' not in keys or not recipe_id:
+        abort(400, 'Invalid request')
+
+    user_rating = int(data['rating'])
+    if user_rating > 5 or user_rating < 1:
+        abort(400, 'Rating out of range')
+
+    if current_app.config['RATING_WRITE_BEHIND']:
+        return buffer_rating(data, recipe_id, user_rating)
+
+    # The delta against the user's previous rating is computed while holding
+    # the recipe row lock, so concurrent ratings cannot be double counted
+    statement = text(
+        'WITH delta AS ('
+        ' SELECT :rating - coalesce(max(rating), 0) AS rating_sum,'
+        ' CASE WHEN count(*) = 0 THEN 1 ELSE 0 END AS num_of_ratings'
+        ' FROM rating WHERE user_id = :user_id AND recipe_id = :recipe_id'
+        '), upsert AS ('
+        ' INSERT INTO rating (user_id, recipe_id, rating)'
+        ' VALUES (:user_id, :recipe_id, :rating)'
+        ' ON CONFLICT (user_id, recipe_id)'
+        ' DO UPDATE SET rating = EXCLUDED.rating'
+        ') '
+        'UPDATE recipe SET '
+        'rating_sum = recipe.rating_sum + delta.rating_sum, '
+        'num_of_ratings = recipe.num_of_ratings + delta.num_of_ratings, '
+        'rating = CAST(recipe.rating_sum + delta.rating_sum AS float) / '
+        '(recipe.num_of_ratings + delta.num_of_ratings) '
+        'FROM delta WHERE recipe.id = :recipe_id '
+        'RETURNING recipe.id, recipe.name, recipe.rating, '
+        'recipe.num_of_ratings'
     )
-    recipe.num_of_ratings += 1
 
     try:
+        owner = db.session \
+            .query(Recipe.user_id) \
+            .filter(Recipe.id == recipe_id) \
+            .with_for_update() \
+            .scalar()
+
+        if owner is None:
+            abort(400, 'Recipe not found')
+
+        if str(owner) == str(data['user_id']):
+            abort(400, 'Users cannot rate their own recipes')
+
+        recipe = db.session.execute(statement, {
+            'rating': user_rating,
+            'user_id': str(data['user_id']),
+            'recipe_id': str(recipe_id)
+        }).first()
+        bus.publish('data')
         db.session.commit()
+    except exc.DataError:
+        abort(400, 'Recipe not found')
+    except exc.IntegrityError:
+        abort(400, 'Invalid user')
     except exc.SQLAlchemyError:
         abort(500, 'Internal server error')
 
+    data_version.bump()
+
     return recipe
 
 
-def get_user_recipes(user_id):
+def get_user_recipes(user_id, args=None):
     try:
-        recipes = db.session.query(Recipe).filter(
-            Recipe.user_id == user_id).all()
+        query = db.session.query(Recipe).filter(Recipe.user_id == user_id)
+        recipes = paginate(query, args or {}, [Recipe.id])
     except exc.DataError:
         abort(400, 'Invalid user')
     except exc.SQLAlchemyError:
@@ -191,14 +540,24 @@ def get_user_recipes(user_id):
     return recipes
 
 
-def get_top_five_ing():
+def get_top_ingredients(args=None):
+    args = args or {}
+    default_k = current_app.config['TOP_INGREDIENTS']
+
+    try:
+        k = int(args.get('k', default_k))
+    except ValueError:
+        abort(400, 'Invalid k')
+
+    if k < 1:
+        abort(400, 'Invalid k')
+
     try:
         most_used_ing = db.session \
             .query(Ingredient) \
-            .join(Ingredient.recipes) \
-            .group_by(Ingredient.id) \
-            .order_by(func.count().desc()) \
-            .limit(5) \
+            .filter(Ingredient.usage_count > 0) \
+            .order_by(Ingredient.usage_count.desc()) \
+            .limit(min(k, current_app.config['MAX_TOP_INGREDIENTS'])) \
             .all()
     except exc.SQLAlchemyError:
         abort(500, 'Internal server error')
@@ -206,45 +565,112 @@ def get_top_five_ing():
     return most_used_ing
 
 
-def filter_recipes():
+def autocomplete_ingredients(args):
+    prefix = args.get('q', '').strip()
+    default_limit = current_app.config['AUTOCOMPLETE_LIMIT']
+
     try:
-        num_ing = db.session \
-            .query(func.count(recipe_ing.c.recipe_id).label('qty')) \
-            .group_by(recipe_ing.c.recipe_id) \
-            .order_by(desc('qty')) \
-            .all()
-        arr = [
-            Recipe.num_of_ingredients == num_ing[0],
-            Recipe.num_of_ingredients == num_ing[-1]
+        limit = int(args.get('limit', default_limit))
+    except ValueError:
+        abort(400, 'Invalid limit')
+
+    if limit < 1:
+        abort(400, 'Invalid limit')
+
+    if not prefix:
+        return []
+
+    return prefix_index.complete(
+        prefix, min(limit, current_app.config['MAX_AUTOCOMPLETE_LIMIT']))
+
+
+def filter_recipes(args=None):
+    try:
+        # Recipes without ingredients are not taken into account
+        extremes = [
+            db.session.query(aggregate(Recipe.num_of_ingredients))
+            .filter(Recipe.num_of_ingredients > 0)
+            .as_scalar()
+            for aggregate in (func.max, func.min)
         ]
-        recipes = db.session \
-            .query(Recipe) \
-            .filter(or_(*arr)) \
-            .order_by(desc(Recipe.num_of_ingredients)) \
-            .all()
+        query = db.session.query(Recipe).filter(
+            Recipe.num_of_ingredients.in_(extremes))
+        recipes = paginate(query, args or {},
+                           [Recipe.num_of_ingredients, Recipe.id],
+                           descending=True)
     except exc.SQLAlchemyError:
         abort(500, 'Internal server error')
 
     return recipes
 
 
+def find_ingredient_ids(terms):
+    """
+    Resolves the ids of all ingredients whose name contains any of the given
+    terms, so recipes can then be matched with a single semi-join. Matches
+    are cached per term until new ingredients are created.
+    """
+    terms = list(dict.fromkeys(term.strip() for term in terms if term.strip()))
+    ids = set()
+    unknown = []
+
+    for term in terms:
+        matches = ingredient_match_cache.get(term)
+        if matches is None:
+            unknown.append(term)
+        else:
+            ids.update(matches)
+
+    if unknown:
+        try:
+            rows = db.session \
+                .query(Ingredient.id, Ingredient.name) \
+                .filter(or_(*[Ingredient.name.contains(term, autoescape=True)
+                              for term in unknown])) \
+                .all()
+        except exc.SQLAlchemyError:
+            abort(500, 'Internal server error')
+
+        for term in unknown:
+            matches = [row.id for row in rows if term in row.name]
+            ingredient_match_cache.set(term, matches)
+            ids.update(matches)
+
+    return list(ids)
+
+
 def search_recipes(args):
     arr = []
+    ranks = []
     keys = list(args.keys())
 
-    if 'name' in keys:
-        arr.append(Recipe.name.contains(args['name']))
-    if 'text' in keys:
-        arr.append(Recipe.preparation.contains(args['text']))
+    for key, column in (('name', Recipe.name), ('text', Recipe.preparation)):
+        if key in keys:
+            document = search_vector(column)
+            terms = func.plainto_tsquery(literal_column("'english'"),
+                                         args[key])
+            arr.append(document.op('@@')(terms))
+            # ts_rank returns real; compare cursors in double precision
+            ranks.append(cast(func.ts_rank(document, terms), Float))
     if 'ingredients' in keys:
-        arr.append(or_(
-            *[Ingredient.name.contains(ingredient)
-              for ingredient in args['ingredients'].split(',')]
-        ))
+        ingredient_ids = find_ingredient_ids(args['ingredients'].split(','))
+        if ingredient_ids:
+            arr.append(Recipe.id.in_(
+                db.session
+                .query(recipe_ing.c.recipe_id)
+                .filter(recipe_ing.c.ingredient_id.in_(ingredient_ids))
+            ))
+        else:
+            arr.append(false())
 
     try:
-        recipes = db.session.query(Recipe).join(Recipe.ingredients).filter(
-            or_(*arr)).all()
+        query = db.session.query(Recipe).filter(or_(*arr))
+        if ranks:
+            rank = sum(ranks[1:], ranks[0]).label('rank')
+            recipes = paginate(query, args, [rank, Recipe.id],
+                               descending=True)
+        else:
+            recipes = paginate(query, args, [Recipe.id])
     except exc.SQLAlchemyError:
         abort(500, 'Internal server error')
 
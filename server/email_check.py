@@ -0,0 +1,61 @@
+import time
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import exc
+from sqlalchemy.dialects.postgresql import insert
+
+from server import db
+from server.cache import email_checks
+from server.models import EmailCheck
+
+
+def normalize_email(email):
+    return email.strip().lower()
+
+
+def get_email_check(email):
+    """
+    Returns the cached check_email result for a normalized email, looking in
+    the in-process cache first and in the email_check table second, or None
+    if there is no unexpired result.
+    """
+    result = email_checks.get(email)
+    if result is not None:
+        return result
+
+    try:
+        row = db.session.query(EmailCheck).get(email)
+    except exc.SQLAlchemyError:
+        db.session.rollback()
+        return None
+
+    if row is None or row.expires <= datetime.now():
+        return None
+
+    result = row.to_dict()
+    email_checks.set(email, result, row.expires.timestamp())
+
+    return result
+
+
+def store_email_check(email, result):
+    """
+    Caches a check_email result in both tiers, for EMAIL_CHECK_TTL seconds
+    if the email is valid and EMAIL_CHECK_NEGATIVE_TTL seconds otherwise.
+    """
+    ttl = current_app.config[
+        'EMAIL_CHECK_TTL' if result['valid'] else 'EMAIL_CHECK_NEGATIVE_TTL']
+    expires = time.time() + ttl
+    values = dict(result, expires=datetime.fromtimestamp(expires))
+
+    statement = insert(EmailCheck.__table__).values(email=email, **values)
+    try:
+        db.session.execute(statement.on_conflict_do_update(
+            index_elements=['email'], set_=values))
+        db.session.commit()
+    except exc.SQLAlchemyError:
+        # The in-process tier still saves the next lookup
+        db.session.rollback()
+
+    email_checks.set(email, result, expires)
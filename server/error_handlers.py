@@ -1,4 +1,4 @@
-from server import server, db
+from server import api, db
 
 
 def get_error_response(error, code):
@@ -8,24 +8,30 @@ def get_error_response(error, code):
     }, code
 
 
-@server.errorhandler(400)
+@api.app_errorhandler(400)
 def user_input_error(error):
     db.session.rollback()
     return get_error_response(error, 400)
 
 
-@server.errorhandler(401)
+@api.app_errorhandler(401)
 def unauthorized_error(error):
     return get_error_response(error, 401)
 
 
-@server.errorhandler(404)
+@api.app_errorhandler(404)
 def not_found_error(error):
     db.session.rollback()
     return get_error_response(error, 404)
 
 
-@server.errorhandler(500)
+@api.app_errorhandler(500)
 def internal_error(error):
     db.session.rollback()
     return get_error_response(error, 500)
+
+
+@api.app_errorhandler(503)
+def service_unavailable_error(error):
+    db.session.rollback()
+    return get_error_response(error, 503)
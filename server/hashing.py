@@ -0,0 +1,75 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from flask import abort, current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+class PasswordHasher(object):
+    """
+    Runs password hashing on a pool of PASSWORD_HASH_WORKERS processes so it
+    does not hold the GIL of the request handling process. At most
+    PASSWORD_HASH_QUEUE hashes are queued or running at once; requests
+    waiting longer than PASSWORD_HASH_TIMEOUT seconds for a slot are
+    answered with 503. With no workers configured, hashing runs inline.
+
+    The pool and its bound are per process, and only pay off with threaded
+    gunicorn workers (see boot.sh): a sync worker handles one request at a
+    time and would block on the hash either way.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._slots = None
+
+    def _start(self, config):
+        with self._lock:
+            if self._executor is None:
+                self._slots = threading.BoundedSemaphore(
+                    config['PASSWORD_HASH_QUEUE'])
+                # Spawned, as forking a threaded process is unsafe
+                self._executor = ProcessPoolExecutor(
+                    config['PASSWORD_HASH_WORKERS'],
+                    mp_context=multiprocessing.get_context('spawn'))
+
+    def _run(self, func, *args):
+        config = current_app.config
+        if not config['PASSWORD_HASH_WORKERS']:
+            return func(*args)
+
+        if self._executor is None:
+            self._start(config)
+
+        if not self._slots.acquire(timeout=config['PASSWORD_HASH_TIMEOUT']):
+            abort(503, 'Server busy, try again later')
+
+        try:
+            return self._executor.submit(func, *args).result()
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password,
+                         current_app.config['PASSWORD_HASH_METHOD'])
+
+    def verify(self, pwhash, password):
+        return self._run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        """
+        Whether the hash was made with another method or cost than the
+        configured PASSWORD_HASH_METHOD.
+        """
+        return pwhash.split('$', 1)[0] != \
+            current_app.config['PASSWORD_HASH_METHOD']
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+
+password_hasher = PasswordHasher()
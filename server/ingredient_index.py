@@ -0,0 +1,174 @@
+import threading
+from collections import defaultdict
+
+from server import db
+from server.models import Ingredient, recipe_ing
+
+
+def _to_bitset(positions):
+    if not positions:
+        return 0
+
+    data = bytearray(max(positions) // 8 + 1)
+    for position in positions:
+        data[position >> 3] |= 1 << (position & 7)
+
+    return int.from_bytes(data, 'little')
+
+
+def _from_bitset(bits):
+    data = bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+
+    return [
+        index * 8 + offset
+        for index, byte in enumerate(data) if byte
+        for offset in range(8) if byte >> offset & 1
+    ]
+
+
+def _at_least(planes, minimum, universe):
+    """
+    Bitset of the positions whose bit-sliced counter (``planes[i]`` holding
+    bit i of every counter) is greater than or equal to ``minimum``.
+    """
+    if minimum.bit_length() > len(planes):
+        return 0
+
+    greater = 0
+    equal = universe
+    for level in reversed(range(len(planes))):
+        plane = planes[level]
+        if minimum >> level & 1:
+            equal &= plane
+        else:
+            greater |= equal & plane
+            equal &= ~plane
+
+    return greater | equal
+
+
+class IngredientIndex(object):
+    """
+    In-process inverted index from ingredient to the recipes using it. Recipe
+    sets are bitsets held in Python ints over dense recipe positions, so a
+    coverage query costs a few bitwise operations per queried ingredient.
+
+    The index is loaded from recipe_ing on first use and then kept up to date
+    incrementally as recipes are created.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self.loaded = False
+        self._recipe_ids = []
+        self._positions = {}
+        self._postings = defaultdict(int)
+        self._by_size = defaultdict(int)
+        # Lowercased name -> ids, names being unique only case sensitively
+        self._ingredient_ids = defaultdict(set)
+
+    def invalidate(self):
+        with self._lock:
+            self._reset()
+
+    def load(self):
+        with self._lock:
+            self._reset()
+
+            for ingredient_id, name in db.session.query(
+                    Ingredient.id, Ingredient.name):
+                self._ingredient_ids[name.lower()].add(ingredient_id)
+
+            recipes = defaultdict(list)
+            rows = db.session \
+                .query(recipe_ing.c.recipe_id, recipe_ing.c.ingredient_id) \
+                .yield_per(10000)
+            for recipe_id, ingredient_id in rows:
+                recipes[recipe_id].append(ingredient_id)
+
+            postings = defaultdict(list)
+            by_size = defaultdict(list)
+            for position, (recipe_id, ingredient_ids) in enumerate(
+                    recipes.items()):
+                self._recipe_ids.append(recipe_id)
+                self._positions[recipe_id] = position
+                by_size[len(ingredient_ids)].append(position)
+                for ingredient_id in ingredient_ids:
+                    postings[ingredient_id].append(position)
+
+            for ingredient_id, positions in postings.items():
+                self._postings[ingredient_id] = _to_bitset(positions)
+            for size, positions in by_size.items():
+                self._by_size[size] = _to_bitset(positions)
+
+            self.loaded = True
+
+    def add_ingredient(self, ingredient_id, name):
+        with self._lock:
+            if self.loaded:
+                self._ingredient_ids[name.lower()].add(ingredient_id)
+
+    def add_recipe(self, recipe_id, ingredients):
+        """
+        Registers a newly created recipe, ``ingredients`` being a list of
+        (id, name) pairs. Does nothing until the index has been loaded.
+        """
+        with self._lock:
+            if not self.loaded or recipe_id in self._positions:
+                return
+
+            position = len(self._recipe_ids)
+            bit = 1 << position
+            self._recipe_ids.append(recipe_id)
+            self._positions[recipe_id] = position
+            self._by_size[len(ingredients)] |= bit
+            for ingredient_id, name in ingredients:
+                self._ingredient_ids[name.lower()].add(ingredient_id)
+                self._postings[ingredient_id] |= bit
+
+    def coverage(self, names, max_missing=0):
+        """
+        Ids of the recipes sharing at least one ingredient with ``names`` and
+        missing at most ``max_missing`` of their own ingredients.
+        """
+        with self._lock:
+            if not self.loaded:
+                self.load()
+
+            ingredient_ids = set()
+            for name in names:
+                ingredient_ids.update(
+                    self._ingredient_ids.get(name.strip().lower(), ()))
+            postings = [
+                self._postings[ingredient_id]
+                for ingredient_id in ingredient_ids
+                if ingredient_id in self._postings
+            ]
+            by_size = list(self._by_size.items())
+            recipe_ids = self._recipe_ids
+
+        matched = 0
+        planes = []
+        for bits in postings:
+            matched |= bits
+            carry = bits
+            for level, plane in enumerate(planes):
+                planes[level] = plane ^ carry
+                carry &= plane
+                if not carry:
+                    break
+            if carry:
+                planes.append(carry)
+
+        result = 0
+        for size, recipes in by_size:
+            result |= recipes & _at_least(
+                planes, max(size - max_missing, 1), matched)
+
+        return [recipe_ids[position] for position in _from_bitset(result)]
+
+
+ingredient_index = IngredientIndex()
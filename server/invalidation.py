@@ -0,0 +1,149 @@
+import json
+import logging
+import os
+import select
+import threading
+import time
+import uuid
+
+from flask import current_app
+from sqlalchemy import text
+
+from server import db
+from server.autocomplete import prefix_index
+from server.cache import (data_version, responses, ingredient_id_cache,
+                          ingredient_match_cache, revoked_tokens)
+from server.ingredient_index import ingredient_index
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'cache_invalidation'
+# Postgres rejects NOTIFY payloads of 8000 bytes or more
+MAX_PAYLOAD = 7999
+POLL_INTERVAL = 5
+RECONNECT_DELAY = 5
+
+
+class InvalidationBus(object):
+    """
+    Cross-process cache invalidation over Postgres LISTEN/NOTIFY. Write paths
+    publish a message in their transaction, so it is delivered to the other
+    workers only once the transaction commits. A listener thread in every
+    worker dispatches incoming messages to the handlers subscribed to their
+    kind, ignoring the messages the worker published itself.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._handlers = {}
+        self._app = None
+        self._thread = None
+        self._origin = uuid.uuid4().hex
+
+    @property
+    def origin(self):
+        # Tell apart workers forked after the bus was created
+        return f'{self._origin}:{os.getpid()}'
+
+    def subscribe(self, kind):
+        def decorator(handler):
+            self._handlers.setdefault(kind, []).append(handler)
+            return handler
+
+        return decorator
+
+    def publish(self, kind, **payload):
+        """
+        Queues a message of the given kind in the current transaction. Too
+        large messages are replaced by a reset of all caches. Nothing is sent
+        when CACHE_INVALIDATION is disabled, as no worker listens then.
+        """
+        if not current_app.config['CACHE_INVALIDATION']:
+            return
+
+        message = json.dumps(
+            dict(payload, kind=kind, origin=self.origin), default=str)
+        if len(message.encode()) > MAX_PAYLOAD:
+            message = json.dumps({'kind': 'reset', 'origin': self.origin})
+
+        db.session.execute(text('SELECT pg_notify(:channel, :message)'),
+                           {'channel': CHANNEL, 'message': message})
+
+    def dispatch(self, message):
+        message = json.loads(message)
+        if message.get('origin') == self.origin:
+            return
+
+        for handler in self._handlers.get(message.get('kind'), []):
+            try:
+                handler(message)
+            except Exception:
+                logger.exception('Failed to handle %s invalidation',
+                                 message.get('kind'))
+
+    def start(self, app):
+        with self._lock:
+            if self._thread is not None:
+                return
+
+            self._app = app
+            self._thread = threading.Thread(
+                target=self._run, name='cache-invalidation', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self._listen()
+            except Exception:
+                logger.exception('Cache invalidation listener failed')
+
+            # Messages may have been missed while disconnected
+            self.dispatch(json.dumps({'kind': 'reset'}))
+            time.sleep(RECONNECT_DELAY)
+
+    def _listen(self):
+        with self._app.app_context():
+            connection = db.engine.raw_connection()
+        connection.detach()
+
+        try:
+            dbapi_connection = connection.connection
+            dbapi_connection.autocommit = True
+            with dbapi_connection.cursor() as cursor:
+                cursor.execute(f'LISTEN {CHANNEL}')
+
+            while True:
+                select.select([dbapi_connection], [], [], POLL_INTERVAL)
+                dbapi_connection.poll()
+                while dbapi_connection.notifies:
+                    notify = dbapi_connection.notifies.pop(0)
+                    with self._app.app_context():
+                        self.dispatch(notify.payload)
+        finally:
+            connection.close()
+
+
+bus = InvalidationBus()
+
+
+@bus.subscribe('data')
+def data_changed(message):
+    data_version.bump()
+
+
+@bus.subscribe('tokens')
+def tokens_changed(message):
+    for jti in message['jti']:
+        revoked_tokens.pop(jti)
+
+
+@bus.subscribe('reset')
+def reset(message):
+    data_version.bump()
+    responses.clear()
+    ingredient_id_cache.clear()
+    ingredient_match_cache.clear()
+    revoked_tokens.clear()
+    ingredient_index.invalidate()
+    prefix_index.invalidate()
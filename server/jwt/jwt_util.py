@@ -1,11 +1,15 @@
+import time
+import uuid
 from datetime import datetime
-from flask import abort
-from sqlalchemy import exc
+import jwt
+from flask import abort, current_app
+from sqlalchemy import exc, text
 from sqlalchemy.orm.exc import NoResultFound
-from flask_jwt_extended import decode_token
 
+from server.cache import revoked_tokens
+from server.invalidation import bus
 from server.models import TokenBlacklist
-from server import server, db
+from server import db
 
 
 def _epoch_utc_to_datetime(epoch_utc):
@@ -16,31 +20,41 @@ def _epoch_utc_to_datetime(epoch_utc):
     return datetime.fromtimestamp(epoch_utc)
 
 
-def add_token_to_database(encoded_token):
+def add_tokens_to_database(encoded_tokens):
     """
-    Adds a new token to the database. It is not revoked when it is added.
+    Adds newly created tokens to the database with a single multi-row INSERT
+    and commit. They are not revoked when they are added.
     """
-    decoded_token = decode_token(encoded_token)
-    jti = decoded_token['jti']
-    token_type = decoded_token['type']
-    user_identity = decoded_token[server.config['JWT_IDENTITY_CLAIM']]
-    expires = _epoch_utc_to_datetime(decoded_token['exp'])
-    revoked = False
-
-    db_token = TokenBlacklist(
-        jti=jti,
-        token_type=token_type,
-        user_identity=user_identity,
-        expires=expires,
-        revoked=revoked,
-    )
+    # The tokens were just created by us, so their signature is not verified
+    claims = [jwt.decode(token, verify=False) for token in encoded_tokens]
+    identity_claim = current_app.config['JWT_IDENTITY_CLAIM']
 
     try:
-        db.session.add(db_token)
+        db.session.execute(TokenBlacklist.__table__.insert().values([
+            {
+                'id': uuid.uuid4(),
+                'jti': token['jti'],
+                'token_type': token['type'],
+                'user_identity': token[identity_claim],
+                'expires': _epoch_utc_to_datetime(token['exp']),
+                'revoked': False
+            }
+            for token in claims
+        ]))
         db.session.commit()
     except exc.SQLAlchemyError:
         abort(500, 'Internal server error')
 
+    for token in claims:
+        revoked_tokens.set(token['jti'], False, token['exp'])
+
+
+def add_token_to_database(encoded_token):
+    """
+    Adds a new token to the database. It is not revoked when it is added.
+    """
+    add_tokens_to_database([encoded_token])
+
 
 def is_token_revoked(decoded_token):
     """
@@ -48,13 +62,30 @@ def is_token_revoked(decoded_token):
     tokens that we create into this database, if the token is not present
     in the database we are going to consider it revoked, as we don't know where
     it was created.
+
+    The revocation state is cached in process for TOKEN_CACHE_TTL seconds at
+    most and never past the expiry of the token. A state read before a
+    concurrent revocation is not cached.
     """
     jti = decoded_token['jti']
+    generation = revoked_tokens.generation
+    revoked = revoked_tokens.get(jti)
+    if revoked is not None:
+        return revoked
+
     try:
-        token = TokenBlacklist.query.filter_by(jti=jti).one()
-        return token.revoked
+        revoked = TokenBlacklist.query.filter_by(jti=jti).one().revoked
     except NoResultFound:
-        return True
+        revoked = True
+
+    revoked_tokens.set(jti, revoked, decoded_token.get('exp'), generation)
+    return revoked
+
+
+def _cache_revocation(jti, revoked, expires):
+    # Popping first invalidates the reads still in flight
+    revoked_tokens.pop(jti)
+    revoked_tokens.set(jti, revoked, expires.timestamp())
 
 
 def revoke_token(token_id, user):
@@ -66,12 +97,16 @@ def revoke_token(token_id, user):
         token = TokenBlacklist.query.filter_by(
             jti=token_id, user_identity=user).one()
         token.revoked = True
+        expires = token.expires
+        bus.publish('tokens', jti=[token.jti])
         db.session.commit()
     except NoResultFound:
         abort(401, 'Token not found')
     except exc.SQLAlchemyError:
         abort(500, 'Internal server error')
 
+    _cache_revocation(token_id, True, expires)
+
 
 def unrevoke_token(token_id, user):
     """
@@ -82,21 +117,46 @@ def unrevoke_token(token_id, user):
         token = TokenBlacklist.query.filter_by(
             id=token_id, user_identity=user).one()
         token.revoked = False
+        jti, expires = token.jti, token.expires
+        bus.publish('tokens', jti=[jti])
         db.session.commit()
     except NoResultFound:
         abort(401, 'Token not found')
 
+    _cache_revocation(jti, False, expires)
 
-def prune_database():
-    """
-    Delete tokens that have expired from the database.
 
-    How (and if) you call this is entirely up you. You could expose it to an
-    endpoint that only administrators could call, you could run it as a cron,
-    set it up with flask cli, etc.
+def prune_database(batch_size=None):
     """
+    Deletes expired tokens from the database in batches of TOKEN_PRUNE_BATCH
+    rows, committing after each batch so that no lock is held for long.
+    Rows locked by a concurrent transaction are skipped and left for the
+    next run. Returns the number of deleted rows and the time taken.
+    """
+    batch_size = batch_size or current_app.config['TOKEN_PRUNE_BATCH']
+    statement = text(
+        'DELETE FROM token_blacklist WHERE ctid IN ('
+        'SELECT ctid FROM token_blacklist WHERE expires < :now '
+        'LIMIT :batch_size FOR UPDATE SKIP LOCKED)'
+    )
+    start = time.perf_counter()
     now = datetime.now()
-    expired = TokenBlacklist.query.filter(TokenBlacklist.expires < now).all()
-    for token in expired:
-        db.session.delete(token)
-    db.session.commit()
+    deleted = 0
+
+    while True:
+        try:
+            count = db.session.execute(
+                statement, {'now': now, 'batch_size': batch_size}).rowcount
+            db.session.commit()
+        except exc.SQLAlchemyError:
+            db.session.rollback()
+            raise
+
+        deleted += count
+        if count < batch_size:
+            break
+
+    return {
+        'deleted': deleted,
+        'elapsed': round(time.perf_counter() - start, 3)
+    }
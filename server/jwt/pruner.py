@@ -0,0 +1,45 @@
+import logging
+import threading
+import time
+
+from server.jwt.jwt_util import prune_database
+
+logger = logging.getLogger(__name__)
+
+
+class TokenPruner(object):
+    """
+    Background thread deleting expired tokens every TOKEN_PRUNE_INTERVAL
+    seconds. An interval of 0 disables it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._app = None
+        self._thread = None
+
+    def start(self, app):
+        with self._lock:
+            if self._thread is not None or \
+                    not app.config['TOKEN_PRUNE_INTERVAL']:
+                return
+
+            self._app = app
+            self._thread = threading.Thread(
+                target=self._run, name='token-pruner', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                with self._app.app_context():
+                    stats = prune_database()
+                logger.info('Pruned %d expired tokens in %.3f s',
+                            stats['deleted'], stats['elapsed'])
+            except Exception:
+                logger.exception('Failed to prune expired tokens')
+
+            time.sleep(self._app.config['TOKEN_PRUNE_INTERVAL'])
+
+
+token_pruner = TokenPruner()
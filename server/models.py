@@ -1,4 +1,5 @@
 from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy import func, literal_column, event, DDL
 from sqlalchemy.dialects.postgresql import UUID
 import uuid
 
@@ -31,7 +32,8 @@ recipe_ing = db.Table(
     db.Column('recipe_id', UUID(as_uuid=True), db.ForeignKey('recipe.id'),
               primary_key=True),
     db.Column('ingredient_id', UUID(as_uuid=True),
-              db.ForeignKey('ingredient.id'), primary_key=True)
+              db.ForeignKey('ingredient.id'), primary_key=True),
+    db.Index('ix_recipe_ing_ingredient_id', 'ingredient_id')
 )
 
 
@@ -43,6 +45,8 @@ class Recipe(db.Model):
     name = db.Column(db.String(40), nullable=False)
     preparation = db.Column(db.String())
     rating = db.Column(db.Float(), default=0)
+    rating_sum = db.Column(db.Integer(), default=0, server_default='0',
+                           nullable=False)
     num_of_ratings = db.Column(db.Integer(), default=0)
     user_id = db.Column(UUID(as_uuid=True), db.ForeignKey('user.id'),
                         nullable=False)
@@ -54,6 +58,27 @@ class Recipe(db.Model):
         return f'<Recipe {self.name}>'
 
 
+def search_vector(column):
+    """
+    Full text search document of a text column. Queries have to use this exact
+    expression for Postgres to pick up the matching GIN index.
+    """
+    return func.to_tsvector(
+        literal_column("'english'"),
+        func.coalesce(column, literal_column("''"))
+    )
+
+
+db.Index('ix_recipe_name_tsv', search_vector(Recipe.name),
+         postgresql_using='gin')
+db.Index('ix_recipe_preparation_tsv', search_vector(Recipe.preparation),
+         postgresql_using='gin')
+db.Index('ix_recipe_num_of_ingredients', Recipe.num_of_ingredients, Recipe.id)
+db.Index('ix_recipe_user_id', Recipe.user_id, Recipe.id)
+db.Index('ix_recipe_leaderboard', Recipe.rating, Recipe.num_of_ratings,
+         Recipe.id)
+
+
 class Ingredient(db.Model):
     __tablename__ = 'ingredient'
 
@@ -62,6 +87,8 @@ class Ingredient(db.Model):
                    default=uuid.uuid4,
                    unique=True, nullable=False)
     name = db.Column(db.String(60), nullable=False, unique=True)
+    usage_count = db.Column(db.Integer(), default=0, server_default='0',
+                            nullable=False, index=True)
     recipes = db.relationship('Recipe', secondary=recipe_ing,
                               back_populates='ingredients', lazy='dynamic')
 
@@ -69,15 +96,35 @@ class Ingredient(db.Model):
         return f'<Ingredient {self.name}>'
 
 
+# Trigram index so substring matches on ingredient names can use an index
+db.Index('ix_ingredient_name_trgm', Ingredient.name, postgresql_using='gin',
+         postgresql_ops={'name': 'gin_trgm_ops'})
+event.listen(Ingredient.__table__, 'before_create',
+             DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm'))
+
+
+class Rating(db.Model):
+    __tablename__ = 'rating'
+
+    user_id = db.Column(UUID(as_uuid=True), db.ForeignKey('user.id'),
+                        primary_key=True)
+    recipe_id = db.Column(UUID(as_uuid=True), db.ForeignKey('recipe.id'),
+                          primary_key=True, index=True)
+    rating = db.Column(db.Integer(), nullable=False)
+
+    def __repr__(self):
+        return f'<Rating {self.rating}>'
+
+
 # Token helper model
 class TokenBlacklist(db.Model):
     id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4,
                    unique=True, nullable=False)
-    jti = db.Column(db.String(36), nullable=False)
+    jti = db.Column(db.String(36), nullable=False, unique=True, index=True)
     token_type = db.Column(db.String(10), nullable=False)
     user_identity = db.Column(db.String(50), nullable=False)
     revoked = db.Column(db.Boolean, nullable=False)
-    expires = db.Column(db.DateTime, nullable=False)
+    expires = db.Column(db.DateTime, nullable=False, index=True)
 
     def to_dict(self):
         return {
@@ -88,3 +135,20 @@ class TokenBlacklist(db.Model):
             'revoked': self.revoked,
             'expires': self.expires
         }
+
+
+class EmailCheck(db.Model):
+    __tablename__ = 'email_check'
+
+    email = db.Column(db.Text, primary_key=True)
+    valid = db.Column(db.Boolean, nullable=False)
+    first_name = db.Column(db.Text)
+    last_name = db.Column(db.Text)
+    expires = db.Column(db.DateTime, nullable=False, index=True)
+
+    def to_dict(self):
+        return {
+            'valid': self.valid,
+            'first_name': self.first_name,
+            'last_name': self.last_name
+        }
@@ -0,0 +1,142 @@
+import base64
+from bisect import bisect_right
+import json
+import uuid
+
+from flask import abort, current_app
+from sqlalchemy import literal, tuple_
+from sqlalchemy.dialects.postgresql import UUID
+
+
+class Page(list):
+    """
+    A single page of query results. Behaves like a plain list and carries the
+    opaque cursor pointing to the next page (None on the last page).
+    """
+
+    def __init__(self, items, next_cursor=None):
+        super().__init__(items)
+        self.next_cursor = next_cursor
+
+
+def encode_cursor(values):
+    values = [str(v) if isinstance(v, uuid.UUID) else v for v in values]
+    raw = json.dumps(values, separators=(',', ':')).encode()
+
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        abort(400, 'Invalid cursor')
+
+    if not isinstance(values, list):
+        abort(400, 'Invalid cursor')
+
+    return values
+
+
+def parse_cursor_value(key, value):
+    """
+    Checks a decoded cursor value against the type of its sort key, so that
+    a tampered cursor is rejected with 400 instead of failing in the query.
+    """
+    if isinstance(key.type, UUID):
+        try:
+            return uuid.UUID(value)
+        except (ValueError, TypeError, AttributeError):
+            abort(400, 'Invalid cursor')
+
+    try:
+        python_type = key.type.python_type
+    except NotImplementedError:
+        python_type = object
+
+    if isinstance(value, bool) or value is None:
+        abort(400, 'Invalid cursor')
+    if python_type is float and isinstance(value, int):
+        return float(value)
+    if not isinstance(value, python_type):
+        abort(400, 'Invalid cursor')
+
+    return value
+
+
+def get_limit(args):
+    default = current_app.config['RECIPES_PER_PAGE']
+    maximum = current_app.config['MAX_RECIPES_PER_PAGE']
+
+    try:
+        limit = int(args.get('limit', default))
+    except (ValueError, TypeError):
+        abort(400, 'Invalid limit')
+
+    if limit < 1:
+        abort(400, 'Invalid limit')
+
+    return min(limit, maximum)
+
+
+def paginate(query, args, keys, descending=False):
+    """
+    Keyset (seek) pagination. Rows are ordered by the given indexed sort keys,
+    the last key being unique, and the page starts right after the row encoded
+    in the ``cursor`` argument, so the cost of fetching a page does not depend
+    on how deep into the result set it is.
+    """
+    limit = get_limit(args)
+    cursor = args.get('cursor')
+
+    if cursor:
+        values = decode_cursor(cursor)
+        if len(values) != len(keys):
+            abort(400, 'Invalid cursor')
+
+        bound = tuple_(*[
+            literal(parse_cursor_value(key, value), type_=key.type)
+            for key, value in zip(keys, values)
+        ])
+        if descending:
+            query = query.filter(tuple_(*keys) < bound)
+        else:
+            query = query.filter(tuple_(*keys) > bound)
+
+    order = [key.desc() if descending else key.asc() for key in keys]
+    rows = query \
+        .add_columns(*keys) \
+        .order_by(*order) \
+        .limit(limit + 1) \
+        .all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][1:])
+
+    return Page([row[0] for row in rows], next_cursor)
+
+
+def paginate_ids(ids, args, key):
+    """
+    Keyset pagination over ids already computed in process, ordered the way
+    Postgres orders ``key``. Returns the ids of the requested page and the
+    cursor of the next one, so only a page worth of rows has to be fetched.
+    """
+    limit = get_limit(args)
+    ids = sorted(ids)
+    cursor = args.get('cursor')
+
+    if cursor:
+        values = decode_cursor(cursor)
+        if len(values) != 1:
+            abort(400, 'Invalid cursor')
+        ids = ids[bisect_right(ids, parse_cursor_value(key, values[0])):]
+
+    next_cursor = None
+    if len(ids) > limit:
+        ids = ids[:limit]
+        next_cursor = encode_cursor(ids[-1:])
+
+    return ids, next_cursor
@@ -0,0 +1,75 @@
+import threading
+import time
+
+from flask import abort, has_request_context
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool
+
+
+class PoolStats(object):
+    """
+    Checkout counters of a connection pool: how many checkouts there were,
+    how long they waited for a connection and how many timed out.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, wait, timed_out=False):
+        with self._lock:
+            self.checkouts += 1
+            self.timeouts += timed_out
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+    def to_dict(self):
+        return {
+            'checkouts': self.checkouts,
+            'timeouts': self.timeouts,
+            'avg_wait_ms': round(
+                self.total_wait / self.checkouts * 1000, 3)
+            if self.checkouts else 0.0,
+            'max_wait_ms': round(self.max_wait * 1000, 3)
+        }
+
+
+class InstrumentedQueuePool(QueuePool):
+    """
+    QueuePool recording checkout waits. When no connection frees up within
+    pool_timeout while serving a request, the request is answered with 503
+    instead of the generic database error.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.stats.record(time.perf_counter() - start, timed_out=True)
+            if has_request_context():
+                abort(503, 'Server busy, try again later')
+            raise
+
+        self.stats.record(time.perf_counter() - start)
+        return connection
+
+    def to_dict(self):
+        return dict(self.stats.to_dict(), **{
+            'size': self.size(),
+            'in_use': self.checkedout(),
+            'idle': self.checkedin(),
+            'overflow': self.overflow()
+        })
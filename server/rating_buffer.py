@@ -0,0 +1,154 @@
+import atexit
+import logging
+import threading
+
+from flask import current_app
+from sqlalchemy import exc, text
+from sqlalchemy.dialects.postgresql import insert
+
+from server import db
+from server.cache import data_version
+from server.invalidation import bus
+from server.models import Recipe, Rating
+
+logger = logging.getLogger(__name__)
+
+
+class RatingBuffer(object):
+    """
+    Per-process write-behind buffer for recipe ratings. Ratings are combined
+    in memory (the latest rating of a user for a recipe wins) and applied by
+    a background thread in a single transaction, every RATING_FLUSH_INTERVAL
+    seconds, as soon as RATING_FLUSH_THRESHOLD ratings are pending, and on
+    interpreter shutdown.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._pending = {}
+        self._app = None
+        self._thread = None
+
+    def start(self, app):
+        with self._lock:
+            if self._thread is not None:
+                return
+
+            self._app = app
+            self._thread = threading.Thread(
+                target=self._run, name='rating-flush', daemon=True)
+            self._thread.start()
+            atexit.register(self.flush)
+
+    def add(self, recipe_id, user_id, rating):
+        if self._thread is None:
+            self.start(current_app._get_current_object())
+
+        with self._lock:
+            self._pending[(str(recipe_id), str(user_id))] = rating
+            full = len(self._pending) >= \
+                self._app.config['RATING_FLUSH_THRESHOLD']
+
+        if full:
+            self._wakeup.set()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self._app.config['RATING_FLUSH_INTERVAL'])
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Failed to flush buffered ratings')
+
+    def _restore(self, pending):
+        with self._lock:
+            for key, rating in pending.items():
+                self._pending.setdefault(key, rating)
+
+    def _apply(self, pending):
+        recipe_ids = sorted({recipe_id for recipe_id, _ in pending})
+        user_ids = {user_id for _, user_id in pending}
+
+        # Lock the recipes first so concurrent raters of the same recipes
+        # (other workers, or rate_recipe) cannot interleave with the deltas
+        db.session \
+            .query(Recipe.id) \
+            .filter(Recipe.id.in_(recipe_ids)) \
+            .order_by(Recipe.id) \
+            .with_for_update() \
+            .all()
+
+        previous = {
+            (str(row.recipe_id), str(row.user_id)): row.rating
+            for row in db.session.query(Rating).filter(
+                Rating.recipe_id.in_(recipe_ids),
+                Rating.user_id.in_(user_ids))
+        }
+
+        deltas = {}
+        for (recipe_id, user_id), rating in pending.items():
+            delta = deltas.setdefault(recipe_id, [0, 0])
+            old = previous.get((recipe_id, user_id))
+            delta[0] += rating - (old or 0)
+            delta[1] += 0 if old is not None else 1
+
+        statement = insert(Rating.__table__).values([
+            {'recipe_id': recipe_id, 'user_id': user_id, 'rating': rating}
+            for (recipe_id, user_id), rating in pending.items()
+        ])
+        db.session.execute(statement.on_conflict_do_update(
+            index_elements=['user_id', 'recipe_id'],
+            set_={'rating': statement.excluded.rating}
+        ))
+
+        rows = []
+        params = {}
+        for i, (recipe_id, (rating_sum, count)) in enumerate(deltas.items()):
+            rows.append(f'(CAST(:id_{i} AS uuid), :sum_{i}, :count_{i})')
+            params.update({
+                f'id_{i}': recipe_id,
+                f'sum_{i}': rating_sum,
+                f'count_{i}': count
+            })
+
+        db.session.execute(text(
+            'UPDATE recipe SET '
+            'rating_sum = recipe.rating_sum + batch.rating_sum, '
+            'num_of_ratings = recipe.num_of_ratings + batch.num_of_ratings, '
+            'rating = CAST(recipe.rating_sum + batch.rating_sum AS float) / '
+            '(recipe.num_of_ratings + batch.num_of_ratings) '
+            f'FROM (VALUES {", ".join(rows)}) '
+            'AS batch (id, rating_sum, num_of_ratings) '
+            'WHERE recipe.id = batch.id'
+        ), params)
+
+    def flush(self):
+        """
+        Applies all pending ratings in one transaction and returns the number
+        of ratings written. Ratings are put back into the buffer if the
+        transaction fails.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+
+        if not pending:
+            return 0
+
+        with self._app.app_context():
+            try:
+                self._apply(pending)
+                bus.publish('data')
+                db.session.commit()
+            except exc.SQLAlchemyError:
+                db.session.rollback()
+                self._restore(pending)
+                raise
+
+        data_version.bump()
+
+        return len(pending)
+
+
+rating_buffer = RatingBuffer()
@@ -1,12 +1,23 @@
-from flask import request, abort
+import json
+from flask import (request, abort, current_app, Response,
+                   stream_with_context)
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from server import server, jwt
+from server import api, db, jwt
 from server.controller import (register_user, add_recipe, get_all_recipes,
-                               rate_recipe, get_user_recipes, get_top_five_ing,
-                               check_email, login, logout, filter_recipes,
-                               search_recipes)
+                               rate_recipe, get_user_recipes,
+                               get_top_ingredients, check_email, login,
+                               logout, filter_recipes, search_recipes,
+                               iter_all_recipes, get_cookable_recipes,
+                               autocomplete_ingredients,
+                               get_top_rated_recipes, warm_ingredient_cache)
 
 from server.jwt.jwt_util import is_token_revoked
+from server.jwt.pruner import token_pruner
+from server.serializers import serialize_recipes
+from server.cache import (cached_response, responses, ingredient_id_cache,
+                          ingredient_match_cache)
+from server.bulk_import import import_recipes, parse_csv, parse_ndjson
+from server.invalidation import bus
 
 
 @jwt.token_in_blacklist_loader
@@ -14,12 +25,37 @@ def check_if_token_revoked(decoded_token):
     return is_token_revoked(decoded_token)
 
 
-@server.route('/user/check/<email>')
+@api.before_app_first_request
+def warm_caches():
+    app = current_app._get_current_object()
+    if app.config['CACHE_INVALIDATION']:
+        bus.start(app)
+    token_pruner.start(app)
+    warm_ingredient_cache()
+
+
+@api.route('/stats/cache')
+@jwt_required
+def cache_stats():
+    return {'message': {
+        'responses': responses.stats(),
+        'ingredient_ids': ingredient_id_cache.stats(),
+        'ingredient_matches': ingredient_match_cache.stats()
+    }}
+
+
+@api.route('/stats/pool')
+@jwt_required
+def pool_stats():
+    return {'message': db.engine.pool.to_dict()}
+
+
+@api.route('/user/check/<email>')
 def check_given_email(email):
     return check_email(email)
 
 
-@server.route('/user/register', methods=['POST'])
+@api.route('/user/register', methods=['POST'])
 def add_new_user():
     if request.is_json:
         data = request.get_json()
@@ -35,7 +71,7 @@ def add_new_user():
         return {'message': new_user}
 
 
-@server.route('/login', methods=['POST'])
+@api.route('/login', methods=['POST'])
 def user_login():
     if request.is_json:
         data = request.get_json()
@@ -44,7 +80,7 @@ def user_login():
         return {'message': token}
 
 
-@server.route('/logout', methods=['PUT'])
+@api.route('/logout', methods=['PUT'])
 @jwt_required
 def user_logout():
     token_id = request.headers.get('Authorization')
@@ -53,7 +89,7 @@ def user_logout():
     return {'message': result}
 
 
-@server.route('/recipe', methods=['POST'])
+@api.route('/recipe', methods=['POST'])
 def add_new_recipe():
     if request.is_json:
         data = request.get_json()
@@ -62,7 +98,21 @@ def add_new_recipe():
         return {'message': f'{result.name} created succesfully'}
 
 
-@server.route('/recipe/<user_id>', methods=['GET'])
+@api.route('/recipe/import', methods=['POST'])
+@jwt_required
+def bulk_import_recipes():
+    lines = (line.decode('utf-8') for line in request.stream)
+    parse = parse_csv if request.mimetype == 'text/csv' else parse_ndjson
+    # Users may only import recipes of their own
+    progress = import_recipes(
+        parse(lines), get_jwt_identity(), force_user=True)
+
+    return Response(
+        stream_with_context(json.dumps(stats) + '\n' for stats in progress),
+        mimetype='application/x-ndjson')
+
+
+@api.route('/recipe/<user_id>', methods=['GET'])
 @jwt_required
 def user_recipes(user_id):
     current_user = get_jwt_identity()
@@ -70,41 +120,54 @@ def user_recipes(user_id):
     if current_user != user_id:
         abort(401, 'Unauthorized')
 
-    result = get_user_recipes(user_id)
-    result = [
-        {
-            'name': recipe.name,
-            'preparation': recipe.preparation,
-            'rating': recipe.rating,
-            'num_of_ratings': recipe.num_of_ratings,
-            'num_of_ingredients': recipe.num_of_ingredients,
-            'ingredients': [ing.name for ing in recipe.ingredients]
-        } for recipe in result]
+    recipes = get_user_recipes(user_id, request.args)
+    result = serialize_recipes(recipes)
 
-    return {'message': result}
+    return {'message': result, 'next_cursor': recipes.next_cursor}
 
 
-@server.route('/recipe/all')
+@api.route('/recipe/all')
+@cached_response
 def all_recipes():
-    recipes = get_all_recipes()
-    result = [
-        {
-            'name': recipe.name,
-            'preparation': recipe.preparation,
-            'rating': recipe.rating,
-            'num_of_ratings': recipe.num_of_ratings,
-            'num_of_ingredients': recipe.num_of_ingredients,
-            'ingredients': [ing.name for ing in recipe.ingredients]
-        } for recipe in recipes]
+    if request.args.get('format') == 'ndjson':
+        return Response(stream_with_context(stream_all_recipes()),
+                        mimetype='application/x-ndjson')
 
-    return {'message': result}
+    recipes = get_all_recipes(request.args)
+    result = serialize_recipes(recipes)
+
+    return {'message': result, 'next_cursor': recipes.next_cursor}
 
 
-@server.route('/rate/<recipe_id>', methods=['PATCH'])
+def stream_all_recipes():
+    for recipes in iter_all_recipes():
+        yield ''.join(
+            json.dumps(recipe) + '\n' for recipe in serialize_recipes(recipes))
+
+
+@api.route('/recipe/cook')
+def cookable_recipes():
+    recipes = get_cookable_recipes(request.args)
+    result = serialize_recipes(recipes)
+
+    return {'message': result, 'next_cursor': recipes.next_cursor}
+
+
+@api.route('/recipe/top')
+@cached_response
+def top_rated_recipes():
+    recipes = get_top_rated_recipes(request.args)
+    result = serialize_recipes(recipes)
+
+    return {'message': result, 'next_cursor': recipes.next_cursor}
+
+
+@api.route('/rate/<recipe_id>', methods=['PATCH'])
 @jwt_required
 def rate(recipe_id):
     if request.is_json:
-        data = request.get_json()
+        # Ratings are always made by the authenticated user
+        data = dict(request.get_json(), user_id=get_jwt_identity())
         result = rate_recipe(data, recipe_id)
 
         return {'message': f'{result.name} rated succesfully'}
@@ -112,45 +175,38 @@ def rate(recipe_id):
         return {'error': 'Unable to rate recipe'}
 
 
-@server.route('/ingredients')
+@api.route('/ingredients')
 @jwt_required
-def top_five_ing():
-    result = get_top_five_ing()
+@cached_response
+def top_ingredients():
+    result = get_top_ingredients(request.args)
     result = [ing.name for ing in result]
 
     return {'message': result}
 
 
-@server.route('/recipe/filter')
+@api.route('/ingredients/autocomplete')
+def ingredient_autocomplete():
+    result = autocomplete_ingredients(request.args)
+
+    return {'message': result}
+
+
+@api.route('/recipe/filter')
 @jwt_required
+@cached_response
 def get_filter_recipes():
-    recipes = filter_recipes()
-    result = [
-        {
-            'name': recipe.name,
-            'preparation': recipe.preparation,
-            'rating': recipe.rating,
-            'num_of_ratings': recipe.num_of_ratings,
-            'num_of_ingredients': recipe.num_of_ingredients,
-            'ingredients': [ing.name for ing in recipe.ingredients]
-        } for recipe in recipes]
+    recipes = filter_recipes(request.args)
+    result = serialize_recipes(recipes)
 
-    return {'message': result}
+    return {'message': result, 'next_cursor': recipes.next_cursor}
 
 
-@server.route('/recipe/search')
+@api.route('/recipe/search')
 @jwt_required
 def get_search_recipes():
 
     recipes = search_recipes(request.args)
-    result = [
-        {
-            'name': recipe.name,
-            'preparation': recipe.preparation,
-            'rating': recipe.rating,
-            'num_of_ratings': recipe.num_of_ratings,
-            'num_of_ingredients': recipe.num_of_ingredients,
-            'ingredients': [ing.name for ing in recipe.ingredients]
-        } for recipe in recipes]
+    result = serialize_recipes(recipes)
 
-    return {'message': result}
+    return {'message': result, 'next_cursor': recipes.next_cursor}
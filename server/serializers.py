@@ -0,0 +1,41 @@
+from collections import defaultdict
+
+from server import db
+from server.models import Ingredient, recipe_ing
+
+
+def get_ingredient_names(recipe_ids):
+    """
+    Loads the ingredient names of all the given recipes with a single query,
+    instead of one query per recipe through the dynamic relationship.
+    """
+    names = defaultdict(list)
+
+    if not recipe_ids:
+        return names
+
+    rows = db.session \
+        .query(recipe_ing.c.recipe_id, Ingredient.name) \
+        .select_from(recipe_ing) \
+        .join(Ingredient, Ingredient.id == recipe_ing.c.ingredient_id) \
+        .filter(recipe_ing.c.recipe_id.in_(recipe_ids)) \
+        .all()
+
+    for recipe_id, name in rows:
+        names[recipe_id].append(name)
+
+    return names
+
+
+def serialize_recipes(recipes):
+    names = get_ingredient_names([recipe.id for recipe in recipes])
+
+    return [
+        {
+            'name': recipe.name,
+            'preparation': recipe.preparation,
+            'rating': recipe.rating,
+            'num_of_ratings': recipe.num_of_ratings,
+            'num_of_ingredients': recipe.num_of_ingredients,
+            'ingredients': names[recipe.id]
+        } for recipe in recipes]
@@ -7,6 +7,12 @@ from dotenv import load_dotenv
 from tests.test_user import UserUnitTest
 from tests.test_ingredient import IngredientUnitTest
 from tests.test_recipe import RecipeUnitTest
+from tests.test_cache import CacheUnitTest
+from tests.test_ingredient_index import IngredientIndexUnitTest
+from tests.test_bulk_import import BulkImportUnitTest
+from tests.test_invalidation import InvalidationUnitTest
+from tests.test_email_check import EmailCheckUnitTest
+from tests.test_pool import PoolUnitTest
 
 # Enable use of os.environ
 basedir = os.path.abspath(os.path.dirname(__file__))
@@ -1,19 +1,48 @@
 import os
 import unittest
+from contextlib import contextmanager
 
-from server import server, db
+from sqlalchemy import event
+
+from server import create_app, db
+from server.cache import (ingredient_id_cache, ingredient_match_cache,
+                          revoked_tokens, email_checks)
+
+app = create_app()
+
+
+@contextmanager
+def count_queries():
+    """
+    Collects the SQL statements executed inside the block into the yielded
+    list.
+    """
+    statements = []
+
+    def count_statement(*args):
+        statements.append(args[2])
+
+    event.listen(db.engine, 'before_cursor_execute', count_statement)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', count_statement)
 
 
 class BaseUnitTest(unittest.TestCase):
 
     def setUp(self):
-        server.config['TESTING'] = True
-        server.config['WTF_CSRF_ENABLED'] = False
-        server.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get(
+        app.config['TESTING'] = True
+        app.config['WTF_CSRF_ENABLED'] = False
+        app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get(
             'DB_TEST_URI')
-        server.config['SECRET_KEY'] = os.environ.get('SECRET_KEY')
-        db.create_all()
+        app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY')
+        db.create_all(app=app)
 
     def tearDown(self):
         db.session.remove()
-        db.drop_all()
+        db.drop_all(app=app)
+        ingredient_id_cache.clear()
+        ingredient_match_cache.clear()
+        revoked_tokens.clear()
+        email_checks.clear()
@@ -0,0 +1,96 @@
+import json
+import uuid
+
+from server.bulk_import import import_recipes, parse_csv, parse_ndjson
+from server.controller import register_user, get_all_recipes
+from server.models import Ingredient
+from tests.base import BaseUnitTest, app
+
+
+class BulkImportUnitTest(BaseUnitTest):
+
+    def test_parse_csv(self):
+        lines = [
+            'name,preparation,user_id,ingredients\n',
+            'Pork,"Fry it, then serve",,Pork; Oil ;\n'
+        ]
+
+        records = list(parse_csv(lines))
+
+        self.assertEqual(1, len(records))
+        self.assertEqual('Fry it, then serve', records[0]['preparation'])
+        self.assertEqual(['Pork', 'Oil'], records[0]['ingredients'])
+
+    def test_import_recipes(self):
+        with app.app_context():
+            user = register_user({
+                'email': 'mi6@user.com',
+                'first_name': 'Ethan',
+                'last_name': 'Hunt',
+                'password': 'agent'
+            })
+            user_id = str(user.id)
+
+            lines = [
+                json.dumps({
+                    'name': 'Pork',
+                    'preparation': 'Everybodys favorite dish',
+                    'ingredients': ['Pork', 'Oil']
+                }),
+                '{not json',
+                json.dumps({
+                    'name': 'Beer pork',
+                    'preparation': None,
+                    'ingredients': ['Pork', 'Beer', 'Pork'],
+                    'user_id': user_id
+                }),
+                json.dumps({
+                    'name': 'Orphan',
+                    'preparation': 'Nobody made this',
+                    'ingredients': ['Pork'],
+                    'user_id': str(uuid.uuid4())
+                })
+            ]
+
+            batch_size = app.config['IMPORT_BATCH_SIZE']
+            app.config['IMPORT_BATCH_SIZE'] = 2
+            try:
+                progress = list(import_recipes(parse_ndjson(lines), user_id))
+            finally:
+                app.config['IMPORT_BATCH_SIZE'] = batch_size
+
+            self.assertEqual(2, len(progress))
+            self.assertEqual(2, progress[-1]['imported'])
+            self.assertEqual(2, progress[-1]['rejected'])
+
+            recipes = get_all_recipes()
+            self.assertEqual(
+                {'Pork', 'Beer pork'}, {r.name for r in recipes})
+
+            usage = dict(
+                Ingredient.query.with_entities(
+                    Ingredient.name, Ingredient.usage_count))
+            self.assertEqual({'Pork': 2, 'Oil': 1, 'Beer': 1}, usage)
+
+    def test_import_recipes_force_user(self):
+        with app.app_context():
+            user, other = [register_user({
+                'email': email,
+                'first_name': 'Ethan',
+                'last_name': 'Hunt',
+                'password': 'agent'
+            }) for email in ('mi6@user.com', 'imf@user.com')]
+
+            lines = [json.dumps({
+                'name': 'Pork',
+                'preparation': 'Everybodys favorite dish',
+                'ingredients': ['Pork'],
+                'user_id': str(other.id)
+            })]
+
+            progress = list(import_recipes(
+                parse_ndjson(lines), str(user.id), force_user=True))
+
+            self.assertEqual(1, progress[-1]['imported'])
+            self.assertEqual(
+                [user.id], [r.user_id for r in get_all_recipes()])
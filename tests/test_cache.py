@@ -0,0 +1,83 @@
+from server.cache import LRUCache, data_version, ingredient_id_cache
+from server.controller import register_user, add_recipe
+from tests.base import BaseUnitTest, app
+
+
+class CacheUnitTest(BaseUnitTest):
+
+    def test_lru_cache_eviction(self):
+        cache = LRUCache(2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        self.assertEqual(1, cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(3, cache.get('c'))
+
+    def test_lru_cache_size_from_config(self):
+        cache = LRUCache('RESPONSE_CACHE_SIZE')
+
+        with app.app_context():
+            self.addCleanup(app.config.__setitem__, 'RESPONSE_CACHE_SIZE',
+                            app.config['RESPONSE_CACHE_SIZE'])
+            app.config['RESPONSE_CACHE_SIZE'] = 1
+            cache.set('a', 1)
+            cache.set('b', 2)
+
+            self.assertEqual(1, len(cache))
+            self.assertEqual(1, cache.stats()['maxsize'])
+
+    def test_conditional_get(self):
+        with app.app_context():
+            data_version.bump()
+            client = app.test_client()
+
+            resp_1 = client.get('/recipe/all')
+            etag = resp_1.headers['ETag']
+            self.assertEqual(200, resp_1.status_code)
+
+            resp_2 = client.get(
+                '/recipe/all', headers={'If-None-Match': etag})
+            self.assertEqual(304, resp_2.status_code)
+
+            user = register_user({
+                'email': 'mi6@user.com',
+                'first_name': 'Ethan',
+                'last_name': 'Hunt',
+                'password': 'agent'
+            })
+            add_recipe({
+                'name': 'Pork',
+                'preparation': 'Everybodys favorite dish',
+                'ingredients': ['Pork', 'Oil'],
+                'user_id': user.id
+            })
+
+            resp_3 = client.get(
+                '/recipe/all', headers={'If-None-Match': etag})
+            self.assertEqual(200, resp_3.status_code)
+            self.assertNotEqual(etag, resp_3.headers['ETag'])
+            self.assertEqual(1, len(resp_3.get_json()['message']))
+
+    def test_ingredient_id_cache(self):
+        with app.app_context():
+            user = register_user({
+                'email': 'mi6@user.com',
+                'first_name': 'Ethan',
+                'last_name': 'Hunt',
+                'password': 'agent'
+            })
+            recipe = {
+                'name': 'Pork',
+                'preparation': 'Everybodys favorite dish',
+                'ingredients': ['Pork', 'Oil'],
+                'user_id': user.id
+            }
+            add_recipe(recipe)
+            hits = ingredient_id_cache.hits
+
+            add_recipe(dict(recipe, name='Fried pork'))
+
+            self.assertEqual(hits + 2, ingredient_id_cache.hits)
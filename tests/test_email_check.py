@@ -0,0 +1,180 @@
+import time
+from unittest.mock import patch
+
+from werkzeug.exceptions import BadRequest, ServiceUnavailable
+
+from server.cache import email_checks
+from server.circuit_breaker import CircuitBreaker, CircuitOpen
+from server.clients import get_hunter, get_clearbit, get_breaker
+from server.controller import check_email
+from server.models import EmailCheck
+from tests.base import BaseUnitTest, app
+from tests.upstreams import FakeUpstream
+
+PERSON = {'name': {'givenName': 'Marc', 'familyName': 'Feldman'}}
+
+
+class EmailCheckUnitTest(BaseUnitTest):
+
+    def setUp(self):
+        super().setUp()
+        with app.app_context():
+            get_breaker('hunter').reset()
+            get_breaker('clearbit').reset()
+
+    def upstreams(self, result, status=200, delay=0, person_status=200):
+        hunter_api = FakeUpstream(
+            {'data': {'result': result}}, status=status, delay=delay)
+        clearbit_api = FakeUpstream(
+            PERSON, status=person_status, delay=delay)
+
+        with app.app_context():
+            patch.object(get_hunter(), 'endpoint',
+                         hunter_api.url + '/{}').start()
+            patch.object(get_clearbit(), 'endpoint', clearbit_api.url).start()
+        self.addCleanup(patch.stopall)
+
+        return hunter_api, clearbit_api
+
+    def test_cached_check(self):
+        hunter_api, clearbit_api = self.upstreams('deliverable')
+
+        with app.app_context(), hunter_api, clearbit_api:
+            expected = {'first_name': 'Marc', 'last_name': 'Feldman'}
+
+            self.assertEqual(expected, check_email('Boogey@User.com'))
+            self.assertEqual(expected, check_email(' boogey@user.com'))
+            self.assertEqual(1, hunter_api.requests)
+            self.assertEqual(1, clearbit_api.requests)
+
+            # Served from the table once evicted from the process
+            email_checks.clear()
+            self.assertEqual(expected, check_email('boogey@user.com'))
+            self.assertEqual(1, hunter_api.requests)
+            self.assertEqual(1, EmailCheck.query.count())
+
+    def test_cached_negative_check(self):
+        hunter_api, clearbit_api = self.upstreams('undeliverable')
+
+        with app.app_context(), hunter_api, clearbit_api:
+            self.assertRaises(BadRequest, check_email, 'boogey@user.com')
+            self.assertRaises(BadRequest, check_email, 'boogey@user.com')
+            self.assertEqual(1, hunter_api.requests)
+            self.assertEqual(1, clearbit_api.requests)
+
+    def test_concurrent_lookups(self):
+        hunter_api, clearbit_api = self.upstreams('deliverable', delay=0.5)
+
+        with app.app_context(), hunter_api, clearbit_api:
+            start = time.monotonic()
+            check_email('boogey@user.com')
+
+            self.assertLess(time.monotonic() - start, 0.9)
+
+    def test_lookup_deadline(self):
+        hunter_api, clearbit_api = self.upstreams('deliverable', delay=1)
+
+        with app.app_context(), hunter_api, clearbit_api:
+            self.addCleanup(app.config.__setitem__,
+                            'EMAIL_CHECK_DEADLINE',
+                            app.config['EMAIL_CHECK_DEADLINE'])
+            app.config['EMAIL_CHECK_DEADLINE'] = 0.2
+
+            start = time.monotonic()
+            self.assertRaises(ServiceUnavailable, check_email,
+                              'boogey@user.com')
+            self.assertLess(time.monotonic() - start, 0.5)
+
+    def test_partial_result(self):
+        hunter_api, clearbit_api = self.upstreams('deliverable', status=500)
+
+        with app.app_context(), hunter_api, clearbit_api:
+            expected = {'first_name': 'Marc', 'last_name': 'Feldman'}
+
+            self.assertEqual(expected, check_email('boogey@user.com'))
+            self.assertEqual(expected, check_email('boogey@user.com'))
+            # Incomplete results are not cached
+            self.assertEqual(2, clearbit_api.requests)
+            self.assertEqual(0, EmailCheck.query.count())
+
+    def test_unknown_person(self):
+        hunter_api, clearbit_api = self.upstreams(
+            'deliverable', person_status=404)
+
+        with app.app_context(), hunter_api, clearbit_api:
+            expected = {'first_name': None, 'last_name': None}
+
+            self.assertEqual(expected, check_email('boogey@user.com'))
+            self.assertEqual(expected, check_email('boogey@user.com'))
+            self.assertEqual(1, clearbit_api.requests)
+            self.assertEqual(1, EmailCheck.query.count())
+
+    def test_unknown_person_open_circuit(self):
+        hunter_api, clearbit_api = self.upstreams(
+            'deliverable', person_status=404)
+
+        with app.app_context(), hunter_api, clearbit_api:
+            hunter_breaker = get_breaker('hunter')
+            for _ in range(hunter_breaker.failure_threshold):
+                hunter_breaker.record_failure()
+
+            self.assertEqual(
+                {'first_name': None, 'last_name': None},
+                check_email('boogey@user.com'))
+
+    def test_pending_person(self):
+        hunter_api, clearbit_api = self.upstreams(
+            'deliverable', person_status=202)
+
+        with app.app_context(), hunter_api, clearbit_api:
+            expected = {'first_name': None, 'last_name': None}
+
+            self.assertEqual(expected, check_email('boogey@user.com'))
+            self.assertEqual(expected, check_email('boogey@user.com'))
+            # Pending lookups are asked again until Clearbit has the person
+            self.assertEqual(2, clearbit_api.requests)
+            self.assertEqual(0, EmailCheck.query.count())
+
+    def test_open_circuit(self):
+        hunter_api, clearbit_api = self.upstreams('deliverable', status=500)
+
+        with app.app_context(), hunter_api, clearbit_api:
+            hunter_breaker = get_breaker('hunter')
+            for _ in range(hunter_breaker.failure_threshold + 2):
+                check_email('boogey@user.com')
+
+            self.assertEqual('open', hunter_breaker.state)
+            self.assertEqual(hunter_breaker.failure_threshold,
+                             hunter_api.requests)
+
+    def test_open_circuit_fails_fast(self):
+        hunter_api, clearbit_api = self.upstreams('deliverable')
+        hunter_api.delay = 5
+
+        with app.app_context(), hunter_api, clearbit_api:
+            hunter_breaker = get_breaker('hunter')
+            for _ in range(hunter_breaker.failure_threshold):
+                hunter_breaker.record_failure()
+
+            start = time.monotonic()
+            self.assertEqual(
+                {'first_name': 'Marc', 'last_name': 'Feldman'},
+                check_email('boogey@user.com'))
+
+            self.assertLess(time.monotonic() - start, 0.5)
+            self.assertEqual(0, hunter_api.requests)
+
+    def test_circuit_breaker(self):
+        breaker = CircuitBreaker('test', 2, 0.1)
+
+        def fail():
+            raise ValueError()
+
+        for _ in range(2):
+            self.assertRaises(ValueError, breaker.call, fail)
+        self.assertRaises(CircuitOpen, breaker.call, lambda: 1)
+
+        time.sleep(0.1)
+        self.assertEqual('half-open', breaker.state)
+        self.assertEqual(1, breaker.call(lambda: 1))
+        self.assertEqual('closed', breaker.state)
@@ -1,18 +1,86 @@
 from werkzeug.exceptions import BadRequest
 
-from server import server
-from server.controller import add_ingredient
-from tests.base import BaseUnitTest
+from server.autocomplete import prefix_index
+from server.controller import (add_ingredient, add_recipe, register_user,
+                               autocomplete_ingredients, get_top_ingredients)
+from tests.base import BaseUnitTest, app
 
 
 class IngredientUnitTest(BaseUnitTest):
 
     def test_valid_add_ingredient(self):
-        with server.app_context():
+        with app.app_context():
             ing = add_ingredient('Onion')
             self.assertEqual(ing.name, 'Onion')
 
     def test_invalid_add_ingredient(self):
-        with server.app_context():
+        with app.app_context():
             self.assertRaises(BadRequest, add_ingredient, '')
             self.assertRaises(BadRequest, add_ingredient, None)
+
+    def test_autocomplete_ingredients(self):
+        with app.app_context():
+            prefix_index.invalidate()
+            user = register_user({
+                'email': 'mi6@user.com',
+                'first_name': 'Ethan',
+                'last_name': 'Hunt',
+                'password': 'agent'
+            })
+            add_ingredient('Onion')
+            add_recipe({
+                'name': 'Pork',
+                'preparation': 'Everybodys favorite dish',
+                'ingredients': ['Pork', 'Oil', 'Olive oil'],
+                'user_id': user.id
+            })
+
+            self.assertEqual(
+                ['Oil', 'Olive oil', 'Onion'],
+                autocomplete_ingredients({'q': 'o'})
+            )
+
+            add_recipe({
+                'name': 'Onion soup',
+                'preparation': 'Everybodys favorite dish',
+                'ingredients': ['Onion', 'Olive oil', 'Oregano'],
+                'user_id': user.id
+            })
+
+            self.assertEqual(
+                ['Olive oil', 'Oil'],
+                autocomplete_ingredients({'q': 'O', 'limit': 2})
+            )
+            self.assertEqual(['Oregano'], autocomplete_ingredients({
+                'q': 'ore'
+            }))
+            self.assertEqual([], autocomplete_ingredients({'q': ' '}))
+
+    def test_top_ingredients(self):
+        with app.app_context():
+            user = register_user({
+                'email': 'mi6@user.com',
+                'first_name': 'Ethan',
+                'last_name': 'Hunt',
+                'password': 'agent'
+            })
+            add_ingredient('Onion')
+            for ingredients in (['Pork', 'Oil', 'Beer'],
+                                ['Pork', 'Oil'],
+                                ['Pork']):
+                add_recipe({
+                    'name': 'Pork',
+                    'preparation': 'Everybodys favorite dish',
+                    'ingredients': ingredients,
+                    'user_id': user.id
+                })
+
+            resp = get_top_ingredients({'k': 2})
+            self.assertEqual(['Pork', 'Oil'], [ing.name for ing in resp])
+            self.assertEqual([3, 2], [ing.usage_count for ing in resp])
+
+            resp = get_top_ingredients()
+            self.assertEqual(
+                ['Pork', 'Oil', 'Beer'], [ing.name for ing in resp])
+
+            self.assertRaises(BadRequest, get_top_ingredients, {'k': 0})
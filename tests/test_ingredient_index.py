@@ -0,0 +1,135 @@
+from werkzeug.exceptions import BadRequest
+
+from server.controller import (register_user, add_recipe,
+                               get_cookable_recipes)
+from server.ingredient_index import ingredient_index, _at_least
+from tests.base import BaseUnitTest, app
+
+
+class IngredientIndexUnitTest(BaseUnitTest):
+
+    def setUp(self):
+        super().setUp()
+        ingredient_index.invalidate()
+
+    def add_recipes(self):
+        user = register_user({
+            'email': 'mi6@user.com',
+            'first_name': 'Ethan',
+            'last_name': 'Hunt',
+            'password': 'agent'
+        })
+
+        recipes = {}
+        for name, ingredients in (('Pork', ['Pork', 'Oil']),
+                                  ('Beer pork', ['Pork', 'Oil', 'Beer']),
+                                  ('Soup', ['Onion', 'Water'])):
+            recipe = add_recipe({
+                'name': name,
+                'preparation': 'Everybodys favorite dish',
+                'ingredients': ingredients,
+                'user_id': user.id
+            })
+            recipes[name] = recipe.id
+
+        return recipes
+
+    def test_bit_sliced_counter(self):
+        # Counters 0..7 at positions 0..7
+        planes = [0b10101010, 0b11001100, 0b11110000]
+        universe = 0b11111111
+
+        self.assertEqual(0b11111000, _at_least(planes, 3, universe))
+        self.assertEqual(0b10000000, _at_least(planes, 7, universe))
+        self.assertEqual(0, _at_least(planes, 8, universe))
+
+    def test_cookable_recipes(self):
+        with app.app_context():
+            recipes = self.add_recipes()
+
+            resp = get_cookable_recipes({'ingredients': 'pork, oil'})
+            self.assertEqual([recipes['Pork']], [r.id for r in resp])
+
+            resp = get_cookable_recipes({
+                'ingredients': 'Pork,Oil',
+                'missing': 1
+            })
+            self.assertEqual(
+                {recipes['Pork'], recipes['Beer pork']},
+                {r.id for r in resp}
+            )
+
+            resp = get_cookable_recipes({'ingredients': 'Tofu'})
+            self.assertEqual(0, len(resp))
+
+    def test_cookable_recipes_pagination(self):
+        with app.app_context():
+            recipes = self.add_recipes()
+            args = {'ingredients': 'Pork,Oil', 'missing': 1, 'limit': 1}
+
+            first = get_cookable_recipes(args)
+            self.assertEqual(1, len(first))
+            self.assertIsNotNone(first.next_cursor)
+
+            second = get_cookable_recipes(
+                dict(args, cursor=first.next_cursor))
+            self.assertEqual(1, len(second))
+            self.assertIsNone(second.next_cursor)
+
+            self.assertEqual(
+                sorted([recipes['Pork'], recipes['Beer pork']]),
+                [first[0].id, second[0].id]
+            )
+
+    def test_incremental_update(self):
+        with app.app_context():
+            recipes = self.add_recipes()
+            ingredient_index.load()
+
+            user = register_user({
+                'email': 'blackwidow@user.com',
+                'first_name': 'Natasha',
+                'last_name': 'Romanov',
+                'password': 'avenger'
+            })
+            recipe = add_recipe({
+                'name': 'Tofu soup',
+                'preparation': 'Everybodys favorite dish',
+                'ingredients': ['Tofu', 'Water'],
+                'user_id': user.id
+            })
+
+            resp = get_cookable_recipes({
+                'ingredients': 'Tofu,Water,Onion'
+            })
+            self.assertEqual(
+                {recipes['Soup'], recipe.id},
+                {r.id for r in resp}
+            )
+
+    def test_ingredient_names_differing_in_case(self):
+        with app.app_context():
+            user = register_user({
+                'email': 'mi6@user.com',
+                'first_name': 'Ethan',
+                'last_name': 'Hunt',
+                'password': 'agent'
+            })
+            recipe_ids = {add_recipe({
+                'name': name,
+                'preparation': 'Everybodys favorite dish',
+                'ingredients': [ingredient],
+                'user_id': user.id
+            }).id for name, ingredient in (('Salted', 'Salt'),
+                                           ('Salty', 'salt'))}
+
+            resp = get_cookable_recipes({'ingredients': 'SALT'})
+            self.assertEqual(recipe_ids, {r.id for r in resp})
+
+    def test_invalid_cookable_request(self):
+        with app.app_context():
+            self.assertRaises(BadRequest, get_cookable_recipes, {})
+            self.assertRaises(BadRequest, get_cookable_recipes, {
+                'ingredients': 'Pork',
+                'missing': -1
+            })
@@ -0,0 +1,42 @@
+import json
+import time
+import uuid
+
+from server import db
+from server.cache import data_version, revoked_tokens
+from server.invalidation import InvalidationBus, bus
+from tests.base import BaseUnitTest, app
+
+
+class InvalidationUnitTest(BaseUnitTest):
+
+    def test_dispatch_ignores_own_messages(self):
+        with app.app_context():
+            version = data_version.value
+
+            bus.dispatch(json.dumps({'kind': 'data', 'origin': bus.origin}))
+            self.assertEqual(version, data_version.value)
+
+            bus.dispatch(json.dumps({'kind': 'data', 'origin': 'other'}))
+            self.assertEqual(version + 1, data_version.value)
+
+    def test_notify_on_commit(self):
+        with app.app_context():
+            jti = str(uuid.uuid4())
+            revoked_tokens.set(jti, False)
+            bus.start(app)
+
+            # Published by another worker
+            other = InvalidationBus()
+            other.publish('tokens', jti=[jti])
+            db.session.rollback()
+            time.sleep(0.5)
+            self.assertIs(False, revoked_tokens.get(jti))
+
+            other.publish('tokens', jti=[jti])
+            db.session.commit()
+            deadline = time.time() + 5
+            while revoked_tokens.get(jti) is not None and \
+                    time.time() < deadline:
+                time.sleep(0.05)
+            self.assertIsNone(revoked_tokens.get(jti))
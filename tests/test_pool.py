@@ -0,0 +1,31 @@
+from server import create_app, db
+from tests.base import BaseUnitTest, app
+
+
+class PoolUnitTest(BaseUnitTest):
+
+    def test_pool_saturation(self):
+        busy_app = create_app()
+        busy_app.config.update({
+            'SQLALCHEMY_DATABASE_URI': app.config['SQLALCHEMY_DATABASE_URI'],
+            'CACHE_INVALIDATION': False,
+            'TOKEN_PRUNE_INTERVAL': 0
+        })
+        busy_app.config['SQLALCHEMY_ENGINE_OPTIONS'].update(
+            pool_size=1, max_overflow=0, pool_timeout=0.1)
+
+        with busy_app.app_context():
+            engine = db.engine
+            with engine.connect():
+                resp = busy_app.test_client().get('/recipe/all')
+
+            self.assertEqual(503, resp.status_code)
+            self.assertEqual(1, engine.pool.stats.timeouts)
+            self.assertEqual(1, engine.pool.to_dict()['size'])
+
+            resp = busy_app.test_client().get('/recipe/all')
+            self.assertEqual(200, resp.status_code)
+            self.assertEqual(0, engine.pool.to_dict()['in_use'])
+
+            db.session.remove()
+            engine.dispose()
@@ -1,16 +1,23 @@
+import json
+import uuid
 from werkzeug.exceptions import BadRequest
 
-from server import server
+from server import db
 from server.controller import (register_user, add_recipe, get_all_recipes,
                                rate_recipe, get_user_recipes,
-                               login)
-from tests.base import BaseUnitTest
+                               login, iter_all_recipes, search_recipes,
+                               filter_recipes, get_top_rated_recipes)
+from server.models import Recipe
+from server.pagination import Page, encode_cursor
+from server.rating_buffer import rating_buffer
+from server.serializers import serialize_recipes
+from tests.base import BaseUnitTest, app, count_queries
 
 
 class RecipeUnitTest(BaseUnitTest):
 
     def test_valid_add_recipe(self):
-        with server.app_context():
+        with app.app_context():
             user_data = {
                 'email': 'test@user.com',
                 'first_name': 'test',
@@ -48,7 +55,7 @@ class RecipeUnitTest(BaseUnitTest):
             )
 
     def test_invalid_add_recipe(self):
-        with server.app_context():
+        with app.app_context():
             user_data = {
                 'email': 'test@user.com',
                 'first_name': 'test',
@@ -71,13 +78,14 @@ class RecipeUnitTest(BaseUnitTest):
             })
 
     def test_get_all_recipe(self):
-        with server.app_context():
+        with app.app_context():
             resp = get_all_recipes()
 
-            self.assertEqual(type(resp), type([]))
+            self.assertIsInstance(resp, Page)
+            self.assertIsNone(resp.next_cursor)
 
     def test_valid_rate_recipe(self):
-        with server.app_context():
+        with app.app_context():
             user_data_1 = {
                 'email': 'mi6@user.com',
                 'first_name': 'Ethan',
@@ -127,7 +135,7 @@ class RecipeUnitTest(BaseUnitTest):
             self.assertEqual(1, res.num_of_ratings)
 
     def test_own_rate_recipe(self):
-        with server.app_context():
+        with app.app_context():
             user_data_1 = {
                 'email': 'mi6@user.com',
                 'first_name': 'Ethan',
@@ -157,7 +165,7 @@ class RecipeUnitTest(BaseUnitTest):
             }, recipe.id)
 
     def test_rate_recipe_bad_recipe_id(self):
-        with server.app_context():
+        with app.app_context():
             user_data_1 = {
                 'email': 'mi6@user.com',
                 'first_name': 'Ethan',
@@ -186,15 +194,55 @@ class RecipeUnitTest(BaseUnitTest):
                 'user_id': reg_user_1.id
             }, 'this aint recipe id')
 
+    def test_rate_recipe_as_authenticated_user(self):
+        with app.app_context():
+            reg_user_1 = register_user({
+                'email': 'mi6@user.com',
+                'first_name': 'Ethan',
+                'last_name': 'Hunt',
+                'password': 'agent'
+            })
+            reg_user_2 = register_user({
+                'email': 'imf@user.com',
+                'first_name': 'Luther',
+                'last_name': 'Stickell',
+                'password': 'hacker'
+            })
+            owner_id, rater_id = str(reg_user_1.id), str(reg_user_2.id)
+
+            recipe = add_recipe({
+                'name': 'Pork',
+                'preparation': 'Everybodys favorite dish',
+                'ingredients': ['Pork', 'Oil'],
+                'user_id': reg_user_1.id
+            })
+            recipe_id = recipe.id
+
+            access_token = login({
+                'email': 'imf@user.com',
+                'password': 'hacker'
+            })['access_token']
+            headers = {'Authorization': 'Bearer ' + access_token}
+
+            # The user_id of the body is ignored
+            client = app.test_client()
+            for user_id in [owner_id, str(uuid.uuid4()), rater_id]:
+                resp = client.patch(f'/rate/{recipe_id}', headers=headers,
+                                    json={'rating': 4, 'user_id': user_id})
+                self.assertEqual(200, resp.status_code)
+
+            recipe = db.session.query(Recipe).get(recipe_id)
+            self.assertEqual(1, recipe.num_of_ratings)
+
     def test_rate_recipe_invalid_request(self):
-        with server.app_context():
+        with app.app_context():
             self.assertRaises(BadRequest, rate_recipe, {
                 'rating': 5,
                 'user_id': 'some id'
             }, None)
 
     def test_rate_recipe_out_of_range(self):
-        with server.app_context():
+        with app.app_context():
             user_data_1 = {
                 'email': 'mi6@user.com',
                 'first_name': 'Ethan',
@@ -228,7 +276,7 @@ class RecipeUnitTest(BaseUnitTest):
             }, recipe.id)
 
     def test_get_valid_user_recipes(self):
-        with server.app_context():
+        with app.app_context():
             user_data_1 = {
                 'email': 'mi6@user.com',
                 'first_name': 'Ethan',
@@ -258,7 +306,7 @@ class RecipeUnitTest(BaseUnitTest):
             self.assertEqual(2, len(resp))
 
     def test_get_invalid_user_recipes(self):
-        with server.app_context():
+        with app.app_context():
             user_data_1 = {
                 'email': 'mi6@user.com',
                 'first_name': 'Ethan',
@@ -277,3 +325,416 @@ class RecipeUnitTest(BaseUnitTest):
                 BadRequest, get_user_recipes,
                 'this aint valid id'
             )
+
+    def test_paginate_user_recipes(self):
+        with app.app_context():
+            user_data_1 = {
+                'email': 'mi6@user.com',
+                'first_name': 'Ethan',
+                'last_name': 'Hunt',
+                'password': 'agent'
+            }
+
+            reg_user_1 = register_user(user_data_1)
+
+            recipe_info = {
+                'name': 'Pork',
+                'preparation': 'Everybodys favorite dish',
+                'ingredients': ['Pork', 'Oil', 'Seasoning', 'Beer'],
+                'user_id': reg_user_1.id
+            }
+
+            for _ in range(3):
+                add_recipe(recipe_info)
+
+            first = get_user_recipes(reg_user_1.id, {'limit': 2})
+            self.assertEqual(2, len(first))
+            self.assertIsNotNone(first.next_cursor)
+
+            second = get_user_recipes(reg_user_1.id, {
+                'limit': 2,
+                'cursor': first.next_cursor
+            })
+            self.assertEqual(1, len(second))
+            self.assertIsNone(second.next_cursor)
+            self.assertFalse(
+                {r.id for r in first} & {r.id for r in second})
+
+    def test_paginate_invalid_cursor(self):
+        with app.app_context():
+            self.assertRaises(BadRequest, get_all_recipes, {
+                'cursor': 'this aint a cursor'
+            })
+
+    def test_paginate_tampered_cursor(self):
+        with app.app_context():
+            for values in [['this aint an id'], [1], [None]]:
+                self.assertRaises(BadRequest, get_all_recipes, {
+                    'cursor': encode_cursor(values)
+                })
+                self.assertRaises(BadRequest, get_user_recipes, str(
+                    uuid.uuid4()), {'cursor': encode_cursor(values)})
+
+    def test_serialize_recipes_query_count(self):
+        with app.app_context():
+            user_data_1 = {
+                'email': 'mi6@user.com',
+                'first_name': 'Ethan',
+                'last_name': 'Hunt',
+                'password': 'agent'
+            }
+
+            reg_user_1 = register_user(user_data_1)
+
+            recipe_info = {
+                'name': 'Pork',
+                'preparation': 'Everybodys favorite dish',
+                'ingredients': ['Pork', 'Oil', 'Seasoning', 'Beer'],
+                'user_id': reg_user_1.id
+            }
+
+            def serialize_all():
+                with count_queries() as statements:
+                    result = serialize_recipes(get_all_recipes())
+                return len(result), len(statements)
+
+            add_recipe(recipe_info)
+            num_recipes, few_queries = serialize_all()
+            self.assertEqual(1, num_recipes)
+
+            for _ in range(4):
+                add_recipe(recipe_info)
+            num_recipes, many_queries = serialize_all()
+            self.assertEqual(5, num_recipes)
+
+            self.assertEqual(few_queries, many_queries)
+
+    def test_stream_all_recipes(self):
+        with app.app_context():
+            user_data_1 = {
+                'email': 'mi6@user.com',
+                'first_name': 'Ethan',
+                'last_name': 'Hunt',
+                'password': 'agent'
+            }
+
+            reg_user_1 = register_user(user_data_1)
+
+            recipe_info = {
+                'name': 'Pork',
+                'preparation': 'Everybodys favorite dish',
+                'ingredients': ['Pork', 'Oil', 'Seasoning', 'Beer'],
+                'user_id': reg_user_1.id
+            }
+
+            for _ in range(3):
+                add_recipe(recipe_info)
+
+            batch_size = app.config['RECIPE_STREAM_BATCH']
+            app.config['RECIPE_STREAM_BATCH'] = 2
+            try:
+                batches = [len(batch) for batch in iter_all_recipes()]
+            finally:
+                app.config['RECIPE_STREAM_BATCH'] = batch_size
+
+            self.assertEqual([2, 1], batches)
+
+            resp = app.test_client().get('/recipe/all?format=ndjson')
+            lines = resp.get_data(as_text=True).splitlines()
+
+            self.assertEqual('application/x-ndjson', resp.mimetype)
+            self.assertEqual(3, len(lines))
+            self.assertEqual(
+                sorted(recipe_info['ingredients']),
+                sorted(json.loads(lines[0])['ingredients'])
+            )
+
+    def test_full_text_search_recipes(self):
+        with app.app_context():
+            user_data_1 = {
+                'email': 'mi6@user.com',
+                'first_name': 'Ethan',
+                'last_name': 'Hunt',
+                'password': 'agent'
+            }
+
+            reg_user_1 = register_user(user_data_1)
+
+            pork = add_recipe({
+                'name': 'Roasted Pork',
+                'preparation': 'Everybodys favorite dish',
+                'ingredients': ['Pork', 'Oil'],
+                'user_id': reg_user_1.id
+            })
+            soup = add_recipe({
+                'name': 'Onion soup',
+                'preparation': 'Boil the onions with a pork bone',
+                'ingredients': ['Onion', 'Water'],
+                'user_id': reg_user_1.id
+            })
+            pork_id, soup_id = pork.id, soup.id
+
+            resp = search_recipes({'name': 'roast'})
+            self.assertEqual({pork_id}, {r.id for r in resp})
+
+            resp = search_recipes({'text': 'onions boiling'})
+            self.assertEqual({soup_id}, {r.id for r in resp})
+
+            resp = search_recipes({'name': 'pork', 'text': 'pork'})
+            self.assertEqual({pork_id, soup_id}, {r.id for r in resp})
+
+    def test_paginate_search_recipes_equal_ranks(self):
+        with app.app_context():
+            user_data_1 = {
+                'email': 'mi6@user.com',
+                'first_name': 'Ethan',
+                'last_name': 'Hunt',
+                'password': 'agent'
+            }
+
+            reg_user_1 = register_user(user_data_1)
+
+            recipe_ids = {add_recipe({
+                'name': 'Roasted Pork',
+                'preparation': 'Everybodys favorite pork dish',
+                'ingredients': ['Pork', 'Oil'],
+                'user_id': reg_user_1.id
+            }).id for _ in range(3)}
+
+            args = {'name': 'pork', 'text': 'favorite', 'limit': 1}
+            seen = []
+            while True:
+                page = search_recipes(args)
+                seen.extend(r.id for r in page)
+                if page.next_cursor is None:
+                    break
+                args['cursor'] = page.next_cursor
+
+            self.assertEqual(3, len(seen))
+            self.assertEqual(recipe_ids, set(seen))
+
+    def test_search_recipes_by_ingredients(self):
+        with app.app_context():
+            user_data_1 = {
+                'email': 'mi6@user.com',
+                'first_name': 'Ethan',
+                'last_name': 'Hunt',
+                'password': 'agent'
+            }
+
+            reg_user_1 = register_user(user_data_1)
+
+            recipe = add_recipe({
+                'name': 'Pork',
+                'preparation': 'Everybodys favorite dish',
+                'ingredients': ['Pork', 'Olive oil', 'Seasoning', 'Beer'],
+                'user_id': reg_user_1.id
+            })
+            recipe_id = recipe.id
+
+            resp = search_recipes({'ingredients': 'Pork, oil,Beer'})
+            self.assertEqual([recipe_id], [r.id for r in resp])
+
+            resp = search_recipes({'ingredients': 'Tofu'})
+            self.assertEqual(0, len(resp))
+
+    def test_filter_recipes(self):
+        with app.app_context():
+            user_data_1 = {
+                'email': 'mi6@user.com',
+                'first_name': 'Ethan',
+                'last_name': 'Hunt',
+                'password': 'agent'
+            }
+
+            reg_user_1 = register_user(user_data_1)
+
+            for ingredients in (['Pork'], ['Pork', 'Oil'],
+                                ['Pork', 'Oil', 'Beer'], ['Beer'], []):
+                add_recipe({
+                    'name': 'Pork',
+                    'preparation': 'Everybodys favorite dish',
+                    'ingredients': ingredients,
+                    'user_id': reg_user_1.id
+                })
+
+            resp = filter_recipes()
+
+            self.assertEqual(
+                [3, 1, 1], [r.num_of_ingredients for r in resp])
+
+    def test_write_behind_rate_recipe(self):
+        with app.app_context():
+            user_data_1 = {
+                'email': 'mi6@user.com',
+                'first_name': 'Ethan',
+                'last_name': 'Hunt',
+                'password': 'agent'
+            }
+
+            user_data_2 = {
+                'email': 'blackwidow@user.com',
+                'first_name': 'Natasha',
+                'last_name': 'Romanov',
+                'password': 'avenger'
+            }
+
+            reg_user_1 = register_user(user_data_1)
+            reg_user_2 = register_user(user_data_2)
+
+            recipe = add_recipe({
+                'name': 'Pork',
+                'preparation': 'Everybodys favorite dish',
+                'ingredients': ['Pork', 'Oil', 'Seasoning', 'Beer'],
+                'user_id': reg_user_1.id
+            })
+            recipe_id = recipe.id
+
+            app.config['RATING_WRITE_BEHIND'] = True
+            try:
+                for rating in (5, 4, 3):
+                    res = rate_recipe({
+                        'rating': rating,
+                        'user_id': str(reg_user_2.id)
+                    }, recipe_id)
+                    self.assertEqual('Pork', res.name)
+
+                self.assertRaises(BadRequest, rate_recipe, {
+                    'rating': 5,
+                    'user_id': str(reg_user_1.id)
+                }, recipe_id)
+            finally:
+                app.config['RATING_WRITE_BEHIND'] = False
+                rating_buffer.flush()
+
+            # Only the latest rating of a user counts
+            recipe = db.session.query(Recipe).get(recipe_id)
+            self.assertEqual(1, recipe.num_of_ratings)
+            self.assertEqual(3, recipe.rating_sum)
+            self.assertEqual(3, recipe.rating)
+
+    def test_rerate_recipe(self):
+        with app.app_context():
+            user_data_1 = {
+                'email': 'mi6@user.com',
+                'first_name': 'Ethan',
+                'last_name': 'Hunt',
+                'password': 'agent'
+            }
+
+            user_data_2 = {
+                'email': 'blackwidow@user.com',
+                'first_name': 'Natasha',
+                'last_name': 'Romanov',
+                'password': 'avenger'
+            }
+
+            reg_user_1 = register_user(user_data_1)
+            reg_user_2 = register_user(user_data_2)
+
+            recipe = add_recipe({
+                'name': 'Pork',
+                'preparation': 'Everybodys favorite dish',
+                'ingredients': ['Pork', 'Oil', 'Seasoning', 'Beer'],
+                'user_id': reg_user_1.id
+            })
+
+            rate_recipe({'rating': 5, 'user_id': reg_user_2.id}, recipe.id)
+            res = rate_recipe({
+                'rating': 2,
+                'user_id': reg_user_2.id
+            }, recipe.id)
+
+            self.assertEqual(1, res.num_of_ratings)
+            self.assertEqual(2, res.rating)
+
+    def test_top_rated_recipes(self):
+        with app.app_context():
+            users = [register_user({
+                'email': f'user{i}@user.com',
+                'first_name': 'test',
+                'last_name': 'Jones',
+                'password': 'donkey'
+            }) for i in range(3)]
+
+            recipe_ids = []
+            for name in ('Pork', 'Beef', 'Tofu'):
+                recipe = add_recipe({
+                    'name': name,
+                    'preparation': 'Everybodys favorite dish',
+                    'ingredients': ['Oil'],
+                    'user_id': users[0].id
+                })
+                recipe_ids.append(recipe.id)
+
+            for recipe_id, ratings in zip(recipe_ids, ([4, 4], [5], [2, 3])):
+                for user, rating in zip(users[1:], ratings):
+                    rate_recipe(
+                        {'rating': rating, 'user_id': user.id}, recipe_id)
+
+            first = get_top_rated_recipes({'limit': 2})
+            self.assertEqual(['Beef', 'Pork'], [r.name for r in first])
+
+            second = get_top_rated_recipes({
+                'limit': 2,
+                'cursor': first.next_cursor
+            })
+            self.assertEqual(['Tofu'], [r.name for r in second])
+            self.assertIsNone(second.next_cursor)
+
+    def test_add_recipe_query_count(self):
+        with app.app_context():
+            user_data_1 = {
+                'email': 'mi6@user.com',
+                'first_name': 'Ethan',
+                'last_name': 'Hunt',
+                'password': 'agent'
+            }
+
+            reg_user_1 = register_user(user_data_1)
+            user_id = reg_user_1.id
+
+            def add_pork(ingredients):
+                with count_queries() as statements:
+                    add_recipe({
+                        'name': 'Pork',
+                        'preparation': 'Everybodys favorite dish',
+                        'ingredients': ingredients,
+                        'user_id': user_id
+                    })
+                return len(statements)
+
+            few_queries = add_pork(['Pork'])
+            many_queries = add_pork(
+                ['Pork'] + [f'Spice {i}' for i in range(20)])
+
+            self.assertEqual(few_queries, many_queries)
+
+    def test_add_recipe_duplicate_ingredients(self):
+        with app.app_context():
+            user_data_1 = {
+                'email': 'mi6@user.com',
+                'first_name': 'Ethan',
+                'last_name': 'Hunt',
+                'password': 'agent'
+            }
+
+            reg_user_1 = register_user(user_data_1)
+
+            resp = add_recipe({
+                'name': 'Pork',
+                'preparation': 'Everybodys favorite dish',
+                'ingredients': ['Pork', 'Oil', 'Pork'],
+                'user_id': reg_user_1.id
+            })
+
+            self.assertEqual(2, resp.num_of_ingredients)
+            self.assertEqual(
+                ['Oil', 'Pork'], sorted(ing.name for ing in resp.ingredients))
+
+            self.assertRaises(BadRequest, add_recipe, {
+                'name': 'Pork',
+                'preparation': 'Everybodys favorite dish',
+                'ingredients': ['Pork', ''],
+                'user_id': reg_user_1.id
+            })
@@ -1,11 +1,18 @@
 
 from werkzeug.exceptions import Forbidden, BadRequest, Unauthorized
+import uuid
+from datetime import datetime, timedelta
 from unittest.mock import patch
 
-from server import server
-from server.models import User
+from flask_jwt_extended import decode_token
+
+from server import db
+from server.models import User, TokenBlacklist
 from server.controller import register_user, login, logout
-from tests.base import BaseUnitTest
+from server.jwt.jwt_util import is_token_revoked, prune_database
+from server.cache import revoked_tokens
+from server.hashing import password_hasher
+from tests.base import BaseUnitTest, app, count_queries
 
 
 class UserUnitTest(BaseUnitTest):
@@ -31,28 +38,30 @@ class UserUnitTest(BaseUnitTest):
         self.assertRaises(BadRequest, register_user, user_data)
 
     def test_valid_registration(self):
-        user_data = {
-            'email': 'user@user.com',
-            'first_name': 'test',
-            'last_name': 'test',
-            'password': 'passing'
-        }
+        with app.app_context():
+            user_data = {
+                'email': 'user@user.com',
+                'first_name': 'test',
+                'last_name': 'test',
+                'password': 'passing'
+            }
 
-        resp = register_user(user_data)
-        self.assertEqual(resp.email, user_data['email'])
+            resp = register_user(user_data)
+            self.assertEqual(resp.email, user_data['email'])
 
     def test_duplicate_registration(self):
-        user_data = {
-            'email': 'john@user.com',
-            'first_name': 'John',
-            'last_name': 'Jones',
-            'password': 'donkey'
-        }
-        register_user(user_data)
-        self.assertRaises(BadRequest, register_user, user_data)
+        with app.app_context():
+            user_data = {
+                'email': 'john@user.com',
+                'first_name': 'John',
+                'last_name': 'Jones',
+                'password': 'donkey'
+            }
+            register_user(user_data)
+            self.assertRaises(BadRequest, register_user, user_data)
 
     def test_valid_login(self):
-        with server.app_context():
+        with app.app_context():
             user_data = {
                 'email': 'test@user.com',
                 'first_name': 'test',
@@ -70,7 +79,7 @@ class UserUnitTest(BaseUnitTest):
                 list(resp.keys()), ['access_token', 'refresh_token'])
 
     def test_invalid_login(self):
-        with server.app_context():
+        with app.app_context():
             user_data = {
                 'email': 'test@user.com',
                 'first_name': 'test',
@@ -84,7 +93,7 @@ class UserUnitTest(BaseUnitTest):
             })
 
     def test_wrong_pass_login(self):
-        with server.app_context():
+        with app.app_context():
             user_data = {
                 'email': 'test@user.com',
                 'first_name': 'test',
@@ -99,7 +108,7 @@ class UserUnitTest(BaseUnitTest):
             })
 
     def test_unknown_user_login(self):
-        with server.app_context():
+        with app.app_context():
             user_data = {
                 'email': 'test@user.com',
                 'first_name': 'test',
@@ -117,7 +126,7 @@ class UserUnitTest(BaseUnitTest):
     @patch('server.controller.get_jwt_identity')
     @patch('flask_jwt_extended.view_decorators.verify_jwt_in_request')
     def test_valid_logout(self, mock_jwt_required, mock_jwt_identity):
-        with server.app_context():
+        with app.app_context():
             user_data = {
                 'email': 'boogey@user.com',
                 'first_name': 'Marc',
@@ -137,3 +146,116 @@ class UserUnitTest(BaseUnitTest):
             resp_2 = logout(logout_creds)
 
             self.assertEqual(resp_2, 'Logout successful')
+
+    @patch('server.controller.get_jwt_identity')
+    def test_token_revocation_cache(self, mock_jwt_identity):
+        with app.app_context():
+            user = register_user({
+                'email': 'boogey@user.com',
+                'first_name': 'Marc',
+                'last_name': 'Feldman',
+                'password': 'donkey'
+            })
+            mock_jwt_identity.return_value = str(user.id)
+
+            access_token = login({
+                'email': 'boogey@user.com',
+                'password': 'donkey'
+            })['access_token']
+            decoded_token = decode_token(access_token)
+
+            with count_queries() as statements:
+                self.assertFalse(is_token_revoked(decoded_token))
+                self.assertFalse(is_token_revoked(decoded_token))
+            self.assertEqual([], statements)
+
+            logout('Bearer ' + access_token)
+            self.assertTrue(is_token_revoked(decoded_token))
+
+    @patch('server.controller.get_jwt_identity')
+    def test_token_revocation_cache_race(self, mock_jwt_identity):
+        with app.app_context():
+            user = register_user({
+                'email': 'boogey@user.com',
+                'first_name': 'Marc',
+                'last_name': 'Feldman',
+                'password': 'donkey'
+            })
+            mock_jwt_identity.return_value = str(user.id)
+
+            access_token = login({
+                'email': 'boogey@user.com',
+                'password': 'donkey'
+            })['access_token']
+            decoded_token = decode_token(access_token)
+            revoked_tokens.clear()
+
+            # A lookup reads the token as valid just before it is revoked
+            generation = revoked_tokens.generation
+            logout('Bearer ' + access_token)
+            revoked_tokens.set(decoded_token['jti'], False,
+                               decoded_token['exp'], generation)
+
+            self.assertTrue(is_token_revoked(decoded_token))
+
+    def test_prune_database(self):
+        with app.app_context():
+            now = datetime.now()
+            for days in [-3, -2, -1, 1, 2]:
+                db.session.add(TokenBlacklist(
+                    jti=str(uuid.uuid4()),
+                    token_type='access',
+                    user_identity='boogey',
+                    revoked=False,
+                    expires=now + timedelta(days=days)
+                ))
+            db.session.commit()
+
+            stats = prune_database(batch_size=2)
+
+            self.assertEqual(3, stats['deleted'])
+            self.assertEqual(2, TokenBlacklist.query.count())
+
+    def test_login_token_insert(self):
+        with app.app_context():
+            register_user({
+                'email': 'boogey@user.com',
+                'first_name': 'Marc',
+                'last_name': 'Feldman',
+                'password': 'donkey'
+            })
+
+            with count_queries() as statements:
+                resp = login({
+                    'email': 'boogey@user.com',
+                    'password': 'donkey'
+                })
+
+            inserts = [statement for statement in statements
+                       if statement.startswith('INSERT INTO token_blacklist')]
+            self.assertEqual(1, len(inserts))
+            self.assertEqual(2, TokenBlacklist.query.count())
+
+            access_token = decode_token(resp['access_token'])
+            self.assertFalse(is_token_revoked(access_token))
+
+    def test_rehash_on_login(self):
+        with app.app_context():
+            user = register_user({
+                'email': 'boogey@user.com',
+                'first_name': 'Marc',
+                'last_name': 'Feldman',
+                'password': 'donkey'
+            })
+            self.assertFalse(password_hasher.needs_rehash(user.password))
+
+            self.addCleanup(app.config.__setitem__,
+                            'PASSWORD_HASH_METHOD',
+                            app.config['PASSWORD_HASH_METHOD'])
+            app.config['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256:200000'
+
+            login({'email': 'boogey@user.com', 'password': 'donkey'})
+
+            user = User.query.filter_by(email='boogey@user.com').one()
+            self.assertTrue(user.password.startswith('pbkdf2:sha256:200000$'))
+            self.assertTrue(user.check_password('donkey'))
@@ -0,0 +1,45 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeUpstream(object):
+    """
+    Local stand-in for a third party JSON API. Answers every GET with
+    ``body`` after ``delay`` seconds and counts the requests it received.
+    """
+
+    def __init__(self, body, status=200, delay=0):
+        self.body = body
+        self.status = status
+        self.delay = delay
+        self.requests = 0
+        upstream = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                upstream.requests += 1
+                time.sleep(upstream.delay)
+                data = json.dumps(upstream.body).encode()
+                self.send_response(upstream.status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self._server.server_port}'
+
+    def __enter__(self):
+        threading.Thread(target=self._server.serve_forever,
+                         daemon=True).start()
+        return self
+
+    def __exit__(self, *args):
+        self._server.shutdown()
+        self._server.server_close()